@@ -0,0 +1,129 @@
+﻿-- Function: ni_graph_csv_queries(character varying, character varying, character varying)
+
+-- DROP FUNCTION ni_graph_csv_queries(character varying, character varying, character varying);
+
+CREATE OR REPLACE FUNCTION ni_graph_csv_queries(character varying, character varying, character varying, OUT csv_file_name text, OUT csv_query text)
+  RETURNS SETOF record AS
+$BODY$ 
+DECLARE
+    --name of the graph to output to csv
+    graph_name ALIAS for $1;
+    
+    --default geometry column name
+    default_geometry_column_name ALIAS for $2;
+    
+	--default schema name
+	default_schema char(6) := 'public';
+	
+    --prefix for all file names
+    output_file_prefix ALIAS for $3;
+    --e.g. prefix_graph_record.csv
+    --e.g. prefix_node_record.csv
+    --e.g. prefix_edge_record.csv
+    --e.g. prefix_edge_geometry_record.csv
+    
+    --used to hold outputs when selecting from Graphs table
+    graph "Graphs"%ROWTYPE;
+    
+    --used to hold outputs when selecting from Global_Interdependency table
+    global_interdependency "Global_Interdependency"%ROWTYPE;
+    global_interdependency_sql text := '';
+    
+    --geometry column output as 'srid=...;wkt' text
+    geometry_text_sql text := '';
+    
+    edge_geometry_table_name text := '';
+    pos integer := 0;
+    
+    column_string varchar := '';
+    view_name varchar := '';
+    
+BEGIN
+    
+    --returns the file name and query of each csv file output for a graph, ni_graph_to_csv runs each query with COPY ... TO a file on the server, and nx_pgnet graph_to_local_csv with COPY ... TO STDOUT
+    
+    --this should only ever return one record as GraphNames are unique
+    EXECUTE 'SELECT * FROM "Graphs" WHERE "GraphName" = '||quote_literal(graph_name)||'' INTO graph;
+    IF graph."GraphID" IS NULL THEN
+        RAISE EXCEPTION 'Network % does not exist in the Graphs table.', graph_name;
+    END IF;
+    
+    geometry_text_sql := '(''srid=''||(ST_SRID(geom)::text)||'';''||(ST_AsText('||quote_ident(default_geometry_column_name)||'::text)::text)) as geom_text';
+    global_interdependency_sql := 'SELECT * FROM "Global_Interdependency" WHERE "InterdependencyFromGraphID" = '||quote_literal(graph."GraphID")||' OR "InterdependencyToGraphID" = '||quote_literal(graph."GraphID")||'';
+    
+    --the whole graph record
+    csv_file_name := output_file_prefix||'_graph_record.csv';
+    csv_query := 'SELECT * FROM "Graphs" WHERE "GraphName" = '||quote_literal(graph_name)||'';
+    RETURN NEXT;
+    
+    --the global interdependency records
+    csv_file_name := output_file_prefix||'_global_interdependency_record.csv';
+    csv_query := global_interdependency_sql;
+    RETURN NEXT;
+    
+    --the nodes table
+    EXECUTE 'SELECT * FROM ni_get_all_table_column_names('||quote_literal(default_schema)||', '||quote_literal(graph."GraphName")||', '||quote_literal('node')||', '||quote_literal(default_geometry_column_name)||')' INTO column_string;
+    csv_file_name := output_file_prefix||'_node_record.csv';
+    csv_query := 'SELECT '||column_string||', '||geometry_text_sql||' FROM '||quote_ident(graph."Nodes")||'';
+    RETURN NEXT;
+    
+    --the edges table
+    csv_file_name := output_file_prefix||'_edge_record.csv';
+    csv_query := 'SELECT * FROM '||quote_ident(graph."Edges")||'';
+    RETURN NEXT;
+    
+    --the edge geometry table
+    pos := position('_Edges' in graph."Edges");
+    edge_geometry_table_name := substring(graph."Edges" FROM 0 FOR pos)||'_Edge_Geometry';
+    EXECUTE 'SELECT * FROM ni_get_all_table_column_names('||quote_literal(default_schema)||', '||quote_literal(graph."GraphName")||', '||quote_literal('edge_geometry')||', '||quote_literal(default_geometry_column_name)||')' INTO column_string;
+    csv_file_name := output_file_prefix||'_edge_geometry_record.csv';
+    csv_query := 'SELECT '||column_string||', '||geometry_text_sql||' FROM '||quote_ident(edge_geometry_table_name)||'';
+    RETURN NEXT;
+    
+    --the interdependency and interdependency edge tables of every interdependency between the chosen graph, and any other graph
+    FOR global_interdependency IN EXECUTE global_interdependency_sql||' ORDER BY "InterdependencyID" ASC' LOOP
+        
+        csv_file_name := output_file_prefix||'_'||global_interdependency."InterdependencyTableName"||'_interdependency_record.csv';
+        csv_query := 'SELECT * FROM '||quote_ident(global_interdependency."InterdependencyTableName")||'';
+        RETURN NEXT;
+        
+        EXECUTE 'SELECT * FROM ni_get_all_view_column_names('||quote_literal(default_schema)||', '||quote_literal(graph."GraphName")||', '||quote_literal('interdependency')||', '||quote_literal(default_geometry_column_name)||')' INTO column_string;
+        csv_file_name := output_file_prefix||'_'||global_interdependency."InterdependencyEdgeTableName"||'_interdependency_edge_record.csv';
+        csv_query := 'SELECT '||column_string||', '||geometry_text_sql||' FROM '||quote_ident(global_interdependency."InterdependencyEdgeTableName")||'';
+        RETURN NEXT;
+        
+    END LOOP;
+    
+    --the node view
+    view_name := graph_name||'_View_Nodes';
+    IF EXISTS (SELECT 1 FROM information_schema.views WHERE table_schema = default_schema AND table_name = view_name) THEN
+        EXECUTE 'SELECT * FROM ni_get_all_view_column_names('||quote_literal(default_schema)||', '||quote_literal(graph."GraphName")||', '||quote_literal('node')||', '||quote_literal(default_geometry_column_name)||')' INTO column_string;
+        csv_file_name := view_name||'.csv';
+        csv_query := 'SELECT '||column_string||', '||geometry_text_sql||' FROM '||quote_ident(view_name)||'';
+        RETURN NEXT;
+    END IF;
+    
+    --the edge and edge_geometry view
+    view_name := graph_name||'_View_Edges_Edge_Geometry';
+    IF EXISTS (SELECT 1 FROM information_schema.views WHERE table_schema = default_schema AND table_name = view_name) THEN
+        EXECUTE 'SELECT * FROM ni_get_all_view_column_names('||quote_literal(default_schema)||', '||quote_literal(graph."GraphName")||', '||quote_literal('edge_geometry')||', '||quote_literal(default_geometry_column_name)||')' INTO column_string;
+        csv_file_name := view_name||'.csv';
+        csv_query := 'SELECT '||column_string||', '||geometry_text_sql||' FROM '||quote_ident(view_name)||'';
+        RETURN NEXT;
+    END IF;
+    
+    --the interdependency and interdependency edge view
+    view_name := graph_name||'_View_Interdependency_Interdependency_Edges';
+    IF EXISTS (SELECT 1 FROM information_schema.views WHERE table_schema = default_schema AND table_name = view_name) THEN
+        EXECUTE 'SELECT * FROM ni_get_all_view_column_names('||quote_literal(default_schema)||', '||quote_literal(graph."GraphName")||', '||quote_literal('interdependency')||', '||quote_literal(default_geometry_column_name)||')' INTO column_string;
+        csv_file_name := view_name||'.csv';
+        csv_query := 'SELECT '||column_string||', '||geometry_text_sql||' FROM '||quote_ident(view_name)||'';
+        RETURN NEXT;
+    END IF;
+        
+RETURN;    
+END;
+$BODY$
+  LANGUAGE plpgsql VOLATILE
+  COST 100;
+ALTER FUNCTION ni_graph_csv_queries(character varying, character varying, character varying) OWNER TO postgres;
@@ -121,9 +121,10 @@ same name will be overwritten.
 
 B{Dependencies}
 
-    - Python 2.6 or later
+    - Python 3
     - NetworkX 1.6 or later
     - OGR 1.8.0 or later
+    - psycopg2 (optional, used for bulk COPY loading in write_pg)
 
 B{Copyright}
 
@@ -169,12 +170,43 @@ __version__ = "0.9.1"
 import sys
 import os
 import uuid
+import struct
+import logging
+import threading
+import concurrent.futures
 import networkx as nx
 import osgeo.ogr as ogr
+import osgeo.gdal as gdal
+
+# psycopg2 is optional, without it write_pg falls back to OGR CreateFeature.
+try:
+    import psycopg2
+    import psycopg2.pool
+except ImportError:
+    psycopg2 = None
+
+# psycopg2 connection pools by connection string, see get_dbapi_connection
+_pools = {}
+# Most connections a pool holds, copy_pg uses at most this many workers.
+POOL_MAX_CONNECTIONS = 25
+_pools_lock = threading.Lock()
+
+# Progress messages from read_pg, silent unless logging is configured
+logger = logging.getLogger(__name__)
 
 # Ask ogr to use Python exceptions rather than stderr messages.
 ogr.UseExceptions()
 
+# Attribute keys holding geometry, these are not written to attribute tables.
+_SKIP_KEYS = frozenset(('Json', 'Wkt', 'Wkb', 'ShpName'))
+
+# OGR field types for Python attribute types, anything else is a string.
+_OGR_TYPES = {int:ogr.OFTInteger, str:ogr.OFTString, float:ogr.OFTReal}
+
+# Conversions applied to numeric field values before COPY, which unlike
+# SetField does not coerce them (e.g. a float into an integer column).
+_COPY_TYPES = {ogr.OFTInteger:int, ogr.OFTReal:float}
+
 class Error(Exception):
     '''Class to handle network IO errors. '''
     # Error class.
@@ -210,14 +242,15 @@ def getfieldinfo(lyr, feature, flds):
 
     lyr - layer created via OGR database connection CreateLayer method
     feature - OGR features from lyr
-    flds - field name list from lyr layer
+    flds - field index (or name) list from lyr layer, indices avoid a name
+           lookup per field per feature
 
     '''
 
     f = feature
     values = []
     for x in flds:
-        field_value = f.GetField(f.GetFieldIndex(x))
+        field_value = f.GetField(x)
 
         #if type(field_value) == str:
         if isinstance(field_value, str):
@@ -247,7 +280,115 @@ def round_coordinate(geom, point_index, precision):
     # return the node coordinate tuple e.g. (0, 0)
     return node_coord_tuple
 
-def read_pg(conn, edgetable, nodetable=None, directed=False, multigraph=False, geometry_precision=2):
+def read_line(edges, nodes, line, attributes, multigraph, precision, exporters):
+    '''Collect an edge for a network from OGR LINESTRING geometry.
+
+    The first and last points of the line are rounded to precision and used
+    as the edge nodes. read_pg adds the collected edges and nodes to the
+    network in one call each.
+
+    edges - list of edge tuples for networkx add_edges_from, the edge is appended to it
+    nodes - list of node tuples for networkx add_nodes_from
+    line - OGR LINESTRING geometry
+    attributes - dict - edge attributes, geometry attributes are added to it
+    multigraph - boolean, true if the network is a multigraph
+    precision - integer, coordinate precision to round node coordinates to
+    exporters - list of (attribute name, OGR export function) tuples
+
+    '''
+    wkb = bytearray(line.ExportToWkb())
+    ends = line_wkb_ends(wkb)
+
+    if ends is None:
+        # count the points in line
+        n = line.GetPointCount()
+        gp = line.GetPoint_2D
+
+        #round the coordinates of the first and last points of the line string geometry, based on the geometry precision value
+        x, y = gp(0)[:2]
+        nodef = (round(x, precision), round(y, precision))
+        x, y = gp(n-1)[:2]
+        nodet = (round(x, precision), round(y, precision))
+
+        #reset the start and the end points of the line string to correspond with the newly rounded coordinates
+        line.SetPoint_2D(0, nodef[0], nodef[1])
+        line.SetPoint_2D((n-1), nodet[0], nodet[1])
+        wkb = line.ExportToWkb()
+    else:
+        #2D line, read and reset the end points in the wkb itself
+        fmt, n, first, last = ends
+        x, y = struct.unpack_from(fmt, wkb, first)
+        nodef = (round(x, precision), round(y, precision))
+        x, y = struct.unpack_from(fmt, wkb, last)
+        nodet = (round(x, precision), round(y, precision))
+        struct.pack_into(fmt, wkb, first, nodef[0], nodef[1])
+        struct.pack_into(fmt, wkb, last, nodet[0], nodet[1])
+
+        #the line itself is only needed for other geometry formats
+        if any(export is not ogr.Geometry.ExportToWkb for name, export in exporters):
+            line.SetPoint_2D(0, nodef[0], nodef[1])
+            line.SetPoint_2D((n-1), nodet[0], nodet[1])
+
+    # set the attributes (akin to nx_shp)
+    for name, export in exporters:
+        if export is ogr.Geometry.ExportToWkb:
+            attributes[name] = bytes(wkb)
+        else:
+            attributes[name] = export(line)
+
+    #check if multigraph
+    if not multigraph:
+        edges.append((nodef, nodet, attributes))
+    else:
+        #define a unique key (helps networkx determine the difference between two edges that start and end at the same place, but may have different attributes)
+        uuid_ = uuid.uuid4().int
+        #add the key to the attribute table of the edge, as we will need this later
+        attributes['uuid'] = uuid_
+        edges.append((nodef, nodet, uuid_, attributes))
+
+def read_multiline(edges, nodes, geom, attributes, multigraph, precision, exporters):
+    '''Collect one edge per line of OGR MULTILINESTRING geometry for a network.
+
+    Assumes the multilinestring is fully connected i.e. no gaps. Each edge
+    gets its own copy of attributes. See read_line for arguments.
+
+    '''
+    for line in geom:
+        read_line(edges, nodes, line, dict(attributes), multigraph, precision,
+                  exporters)
+
+def read_point(edges, nodes, geom, attributes, multigraph, precision, exporters):
+    '''Collect a node for a network from OGR POINT geometry.
+
+    See read_line for arguments.
+
+    '''
+    nodes.append((geom.GetPoint_2D(0), attributes))
+
+# Functions collecting features for a network by flattened OGR geometry type,
+# see read_pg
+_GEOM_HANDLERS = {ogr.wkbLineString:read_line,
+                  ogr.wkbMultiLineString:read_multiline,
+                  ogr.wkbPoint:read_point}
+
+# Edge geometry attributes read_pg can store, by geom_formats name
+_GEOM_EXPORTERS = {'wkb':('Wkb', ogr.Geometry.ExportToWkb),
+                   'wkt':('Wkt', ogr.Geometry.ExportToWkt),
+                   'json':('Json', ogr.Geometry.ExportToJson)}
+
+def geometry_wkt(data):
+    '''Return the Wkt geometry of a node or edge, computing it from Wkb if needed.
+
+    read_pg can be asked to store only Wkb, use this where Wkt is required.
+
+    data - dictionary of attributes, containing Wkt or Wkb geometry
+
+    '''
+    if 'Wkt' in data:
+        return data['Wkt']
+    return ogr.CreateGeometryFromWkb(data['Wkb']).ExportToWkt()
+
+def read_pg(conn, edgetable, nodetable=None, directed=False, multigraph=False, geometry_precision=2, geom_formats=('wkb', 'wkt', 'json'), progress_every=10000):
     '''Read a network from PostGIS table of line geometry.
 
        Optionally takes a table of points and where point geometry is equal
@@ -269,15 +410,20 @@ def read_pg(conn, edgetable, nodetable=None, directed=False, multigraph=False, g
        directed - boolean denoting whether network to create is directed (True = directed, False = undirected)
        multigraph - boolean denoting whether network to create is multigraph (True = multigraph, False = graph)
        geometry_precision - integer denoting precision to round geometry coordinates to
+       geom_formats - sequence of geometry formats to store as edge attributes, any of 'wkb', 'wkt' and 'json' (default all three, pass ('wkb',) to store Wkb only, see geometry_wkt)
+       progress_every - integer number of edge features between progress messages on the module logger at INFO level (0 for none)
        '''
 
     if conn == None:
         raise Error('No connection to database.')
 
-    edge_lyr = None
-    for tbl in conn:
-        if tbl.GetName() == edgetable:
-            edge_lyr = tbl
+    try:
+        exporters = [_GEOM_EXPORTERS[fmt.lower()] for fmt in geom_formats]
+    except KeyError as err:
+        raise Error('Geometry format not supported: %s.' % (err.args[0]))
+
+    # Look the tables up by name rather than walking every layer in conn
+    edge_lyr = conn.GetLayerByName(edgetable)
     if edge_lyr == None:
         raise Error('Table not found in database: %s.' % (edgetable))
 
@@ -296,127 +442,86 @@ def read_pg(conn, edgetable, nodetable=None, directed=False, multigraph=False, g
 
     if nodetable is not None:
         nodes = {}
-        for node_lyr in conn:
-            if node_lyr.GetName() == nodetable:
-                f = node_lyr.GetNextFeature()
-                flds = [x.GetName() for x in node_lyr.schema]
-                while f is not None:
-                    flddata = getfieldinfo(node_lyr, f, flds )
-                    attributes = dict(list(zip(flds, flddata)))
-
-                    # Get the geometry for that feature
-                    geom = f.GetGeometryRef()
-
-                    # Check that we're dealing with point data'
-                    if ogr.Geometry.GetGeometryName(geom) != 'POINT':
-                        raise Error('Error:'\
-                            'Node table does not contain point geometry')
-                    else:
-                        # Get the coordinate of the node and apply a precision
-                        node_coord=round_coordinate(geom, 0, geometry_precision)
-                        nodes[node_coord] = attributes
-
-                        f = node_lyr.GetNextFeature()
-
-    #looping the edge layer
+        node_lyr = conn.GetLayerByName(nodetable)
+        if node_lyr is not None:
+            # read the whole layer from the start, in one sequential scan
+            node_lyr.SetAttributeFilter(None)
+            node_lyr.SetSpatialFilter(None)
+            node_lyr.ResetReading()
+            f = node_lyr.GetNextFeature()
+            flds = [x.GetName() for x in node_lyr.schema]
+            defn = node_lyr.GetLayerDefn()
+            fld_idxs = [defn.GetFieldIndex(x) for x in flds]
+            while f is not None:
+                flddata = getfieldinfo(node_lyr, f, fld_idxs)
+                attributes = dict(zip(flds, flddata))
+
+                # Get the geometry for that feature
+                geom = f.GetGeometryRef()
+
+                # Check that we're dealing with point data'
+                if ogr.GT_Flatten(geom.GetGeometryType()) != ogr.wkbPoint:
+                    raise Error('Error:'\
+                        'Node table does not contain point geometry')
+                else:
+                    # Get the coordinate of the node and apply a precision
+                    node_coord=round_coordinate(geom, 0, geometry_precision)
+                    nodes[node_coord] = attributes
+
+                    f = node_lyr.GetNextFeature()
+
+    #looping the whole edge layer, from the start in one sequential scan
+    #(layers are shared by the data source so may carry an earlier filter)
+    edge_lyr.SetAttributeFilter(None)
+    edge_lyr.SetSpatialFilter(None)
+    edge_lyr.ResetReading()
     f = edge_lyr.GetNextFeature()
     flds = [x.GetName() for x in edge_lyr.schema]
+    defn = edge_lyr.GetLayerDefn()
+    fld_idxs = [defn.GetFieldIndex(x) for x in flds]
 
     edge_counter = 0
+    # edges and nodes collected from the features, added to net after the loop
+    edges = []
+    points = []
+    # Only count features and format messages if somebody is listening
+    if not progress_every or not logger.isEnabledFor(logging.INFO):
+        progress_every = 0
+    else:
+        edge_total = edge_lyr.GetFeatureCount()
+        logger.info("reading %d features from %s", edge_total, edgetable)
 
     while f is not None:
         edge_counter += 1
-        flddata = getfieldinfo(edge_lyr, f, flds )
+        if progress_every and edge_counter % progress_every == 0:
+            logger.info("read %d / %d features from %s", edge_counter,
+                        edge_total, edgetable)
+        flddata = getfieldinfo(edge_lyr, f, fld_idxs)
 
         # Get the attributes for that feature
-        attributes = dict(list(zip(flds, flddata)))
+        attributes = dict(zip(flds, flddata))
 
         # Get the geometry for that feature
         geom = f.GetGeometryRef()
 
-        #We've got Multiline geometry so split into line segments
-        #assume that the multilinestring is fully connected i.e. no gaps
         if geom is not None:
-            if ((ogr.Geometry.GetGeometryName(geom) == 'MULTILINESTRING')):
-                for line in geom:
-
-                    # count the points in line
-                    n = line.GetPointCount()
-
-                    #round the coordinates of the first and last points of the line string geometry, based on the geometry precision value
-                    node_coord_f = round_coordinate(line, 0, geometry_precision)
-                    node_coord_t = round_coordinate(line, (n-1), geometry_precision)
-
-                    #reset the start and the end points of the line string to correspond with the newly rounded coordinates
-                    line.SetPoint_2D(0, node_coord_f[0], node_coord_f[1])
-                    line.SetPoint_2D((n-1), node_coord_t[0], node_coord_t[1])
-
-                    # set the attributes (akin to nx_shp)
-                    attributes["Wkb"] = ogr.Geometry.ExportToWkb(line)
-                    attributes["Wkt"] = ogr.Geometry.ExportToWkt(line)
-                    attributes["Json"] = ogr.Geometry.ExportToJson(line)
-
-                    #set the to and from node value
-                    nodef = node_coord_f
-                    nodet = node_coord_t
-
-                    #check if multigraph
-                    if not multigraph:
-                        net.add_edge(nodef, nodet, attributes)
-                    else:
-                        #define a unique key (helps networkx determine the difference between two edges that start and end at the same place, but may have different attributes)
-                        uuid_ = uuid.uuid4().int
-                        #add the key to the attribute table of the edge, as we will need this later
-                        attributes['uuid'] = uuid_
-                        net.add_edge(nodef, nodet, key=uuid_, attr_dict=attributes)
-
-            elif ogr.Geometry.GetGeometryName(geom) == 'LINESTRING':
-
-                # count the points in line
-                n = geom.GetPointCount()
-
-                #round the coordinates of the first and last points of the line string geometry, based on the geometry precision value
-                node_coord_t = round_coordinate(geom, (n-1), geometry_precision)
-                node_coord_f = round_coordinate(geom, 0, geometry_precision)
-
-                #reset the start and the end points of the line string to correspond with the newly rounded coordinates
-                geom.SetPoint_2D(0, node_coord_f[0], node_coord_f[1])
-                geom.SetPoint_2D((n-1), node_coord_t[0], node_coord_t[1])
-
-                # set the attributes (akin to nx_shp)
-                attributes["Wkb"] = ogr.Geometry.ExportToWkb(geom)
-                attributes["Wkt"] = ogr.Geometry.ExportToWkt(geom)
-                attributes["Json"] = ogr.Geometry.ExportToJson(geom)
-
-                #set the to and from node value
-                nodef = node_coord_f
-                nodet = node_coord_t
-
-                #check if multigraph
-                if not multigraph:
-                    net.add_edge(nodef, nodet, attributes)
-                else:
-                    #define a unique key (helps networkx determine the difference between two edges that start and end at the same place, but may have different attributes)
-                    uuid_ = uuid.uuid4().int
-                    #add the key to the attribute table of the edge, as we will need this later
-                    attributes['uuid'] = uuid_
-                    net.add_edge(nodef, nodet, key=uuid_, attr_dict=attributes)
-
-            elif ogr.Geometry.GetGeometryName(geom) == 'POINT':
-                net.add_node((geom.GetPoint_2D(0)), attributes)
-            else:
+            handler = _GEOM_HANDLERS.get(ogr.GT_Flatten(geom.GetGeometryType()))
+            if handler is None:
                 raise ValueError("PostGIS geometry type not"\
                                     " supported.")#
+            handler(edges, points, geom, attributes, multigraph,
+                    geometry_precision, exporters)
 
         f = edge_lyr.GetNextFeature()
         # Raise warning if nx_is_connected(G) is false.
 
-
+    net.add_edges_from(edges)
+    net.add_nodes_from(points)
 
     # Attribution of nodes from points table (must exist in network)
     if nodetable is not None:
         for point in nodes:
-            if point in net.nodes():
+            if point in net:
                 net.node[point] = nodes[point]
 
     # End of function, return the network
@@ -434,42 +539,504 @@ def netgeometry(key, data):
         geom = ogr.CreateGeometryFromWkb(data['Wkb'])
     elif 'Wkt' in data:
         geom = ogr.CreateGeometryFromWkt(data['Wkt'])
-    elif type(key[0]) == 'tuple': # edge keys are packed tuples
+    elif isinstance(key[0], tuple): # edge keys are packed tuples
         geom = ogr.Geometry(ogr.wkbLineString)
         _from, _to = key[0], key[1]
-        geom.SetPoint_2D(0, *_from)
-        geom.SetPoint_2D(1, *_to)
+        geom.SetPoint_2D(0, _from[0], _from[1])
+        geom.SetPoint_2D(1, _to[0], _to[1])
     else:
         geom = ogr.Geometry(ogr.wkbPoint)
-        geom.SetPoint_2D(0, *key)
+        geom.SetPoint_2D(0, key[0], key[1])
     return geom
 
-def create_feature(geometry, lyr, attributes=None):
+def wkb_type(wkb):
+    '''Return the OGR geometry type of WKB from its header, without parsing it.
+
+    Z/M variants and EWKB flags are ignored e.g. 1 for a point, 2 for a
+    linestring and 5 for a multilinestring.
+
+    wkb - WKB (or EWKB) bytes
+
+    '''
+    if wkb[0] == 1:
+        geomtype = struct.unpack_from('<I', wkb, 1)[0]
+    else:
+        geomtype = struct.unpack_from('>I', wkb, 1)[0]
+    return (geomtype & 0x0FFFFFFF) % 1000
+
+def line_wkb_ends(wkb):
+    '''Locate the end points of 2D LINESTRING WKB, without parsing it.
+
+    Returns a (struct format, point count, first point offset, last point
+    offset) tuple, or None if wkb is not a non-empty 2D linestring.
+
+    wkb - WKB bytes
+
+    '''
+    if wkb[0] == 1:
+        order = '<'
+    else:
+        order = '>'
+    geomtype, n = struct.unpack_from(order + 'II', wkb, 1)
+    if geomtype != ogr.wkbLineString or n == 0:
+        return None
+    return (order + 'dd', n, 9, 9 + 16 * (n - 1))
+
+def point_wkb(x, y):
+    '''Return little endian WKB for a 2D point, without creating OGR geometry.'''
+    return struct.pack('<BIdd', 1, ogr.wkbPoint, x, y)
+
+def line_wkb(x0, y0, x1, y1):
+    '''Return little endian WKB for a 2D two point line, without creating OGR geometry.'''
+    return struct.pack('<BIIdddd', 1, ogr.wkbLineString, 2, x0, y0, x1, y1)
+
+def wkb_hex(key, data):
+    '''Return the geometry of a node or edge as hex encoded WKB.
+
+    Wkb attributes are passed straight through, without being parsed into
+    an OGR geometry and serialised again. Where there is no Wkb or Wkt the
+    geometry is packed directly from the node coordinates, as a point for a
+    node key or a two point line for an edge key.
+
+    key - tuple of coordinates
+    data - dictionary of attributes, potentially containing Wkb/Wkt representation of geometry to create
+
+    '''
+    if 'Wkb' in data:
+        wkb = bytes(data['Wkb'])
+        # Check the header only, the tables take lines for edges and points for nodes
+        if isinstance(key[0], tuple):
+            expected = ogr.wkbLineString
+        else:
+            expected = ogr.wkbPoint
+        if wkb_type(wkb) != expected:
+            raise Error('Geometry type %s does not match table geometry type %s.'
+                        % (wkb_type(wkb), expected))
+        return wkb.hex()
+    if 'Wkt' in data:
+        return bytes(netgeometry(key, data).ExportToWkb()).hex()
+    if isinstance(key[0], tuple): # edge keys are packed tuples
+        _from, _to = key[0], key[1]
+        return line_wkb(_from[0], _from[1], _to[0], _to[1]).hex()
+    return point_wkb(key[0], key[1]).hex()
+
+def create_feature(geometry, lyr, attributes=None, feature=None):
     '''Wrapper for OGR CreateFeature function.
     Creates a feature in the specified table with geometry and attributes.
 
     geometry - OGR geometry
     lyr - layer created in database
-    attributes - attribute dictionary
+    attributes - attribute dictionary, keyed by field name or index. None values are left unset (NULL).
+    feature - optional OGR feature of lyr to reuse instead of allocating one per call. Fields not in attributes keep their previous values, so pass every field when reusing.
     '''
-    feature = ogr.Feature(lyr.GetLayerDefn())
+    reuse = feature is not None
+    if reuse:
+        # CreateFeature copies the feature, reset the FID so a new one is assigned
+        feature.SetFID(-1)
+    else:
+        feature = ogr.Feature(lyr.GetLayerDefn())
     feature.SetGeometry(geometry)
 
     if attributes != None:
         for field, data in attributes.items():
-            feature.SetField(field, data)
+            if data is not None:
+                feature.SetField(field, data)
+            elif reuse:
+                feature.UnsetField(field)
 
     lyr.CreateFeature(feature)
 
-    feature.Destroy()
+    if not reuse:
+        feature.Destroy()
+
+
+def collect_schema(items, skip=_SKIP_KEYS):
+    '''Find attribute fields and their OGR types in a single pass.
+
+    Returns an ordered list of (key, OGR field type) tuples, in order of first
+    appearance. The type is taken from the first value seen for each key.
+
+    items - iterable of attribute dicts e.g. edge data from G.edges(data=True)
+    skip - keys not written to the attribute table
+
+    '''
+    fields = {}
+    schema = []
+    for attrs in items:
+        for key, data in attrs.items():
+            if key not in fields and key not in skip:
+                fields[key] = _OGR_TYPES.get(type(data), ogr.OFTString)
+                schema.append((key, fields[key]))
+    return schema
+
+def create_fields(lyr, schema):
+    '''Create all fields of a schema on a layer.
+
+    Returns the list of column names as created in the database (OGR may
+    launder them), in schema order.
+
+    lyr - layer created in database
+    schema - list of (key, OGR field type) tuples from collect_schema
+
+    '''
+    for key, fieldtype in schema:
+        lyr.CreateField(ogr.FieldDefn(key, fieldtype))
+    defn = lyr.GetLayerDefn()
+    count = defn.GetFieldCount()
+    return [defn.GetFieldDefn(i).GetName()
+            for i in range(count - len(schema), count)]
+
+def has_dbapi_connection(conn):
+    '''Return True if get_dbapi_connection can provide a connection for conn.
+
+    conn - OGR database connection or DB-API connection
+
+    '''
+    if hasattr(conn, 'cursor'):
+        return True
+    return psycopg2 is not None and conn.GetName().startswith('PG:')
+
+def get_dbapi_connection(conn):
+    '''Return a DB-API (psycopg2) connection to the database behind conn.
+
+    If conn is already a DB-API connection it is returned unchanged, otherwise
+    a psycopg2 connection is taken from a pool kept per OGR connection string
+    (1 to POOL_MAX_CONNECTIONS connections). Return it with release_dbapi_connection.
+    Returns None if psycopg2 is not installed or conn is not a PostgreSQL
+    connection.
+
+    conn - OGR database connection or DB-API connection
+
+    '''
+    if hasattr(conn, 'cursor'):
+        return conn
+    if not has_dbapi_connection(conn):
+        return None
+    dsn = conn.GetName()
+    with _pools_lock:
+        if dsn not in _pools:
+            _pools[dsn] = psycopg2.pool.ThreadedConnectionPool(
+                1, POOL_MAX_CONNECTIONS, dsn[3:])
+    return _pools[dsn].getconn()
+
+def release_dbapi_connection(conn, dbapi_conn):
+    '''Return a connection from get_dbapi_connection to its pool.
+
+    conn - connection passed to get_dbapi_connection
+    dbapi_conn - DB-API connection it returned
+
+    '''
+    if dbapi_conn is None or dbapi_conn is conn:
+        return
+    _pools[conn.GetName()].putconn(dbapi_conn)
+
+def _quote_ident(name):
+    '''Quote a table or column name for use in SQL.'''
+    return '"%s"' % name.replace('"', '""')
+
+def _field_value(value, fieldtype):
+    '''Convert a value to the Python type of its OGR field, as SetField would.
+
+    Values which do not convert are returned unchanged, for COPY to reject.
+
+    value - attribute value
+    fieldtype - OGR field type from collect_schema
+
+    '''
+    convert = _COPY_TYPES.get(fieldtype)
+    if value is None or convert is None:
+        return value
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        return value
+
+def _copy_value(value):
+    '''Format a value for the PostgreSQL COPY text format.'''
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def iter_nodes(network):
+    '''Iterate over (node, data) of a network without building a list.
+
+    network - networkx network type
+
+    '''
+    if hasattr(network, 'nodes_iter'):
+        return network.nodes_iter(data=True)
+    return iter(network.nodes(data=True))
+
+def iter_edges(network):
+    '''Iterate over (u, v, data) of a network without building a list.
+
+    network - networkx network type
+
+    '''
+    if hasattr(network, 'edges_iter'):
+        return network.edges_iter(data=True)
+    return iter(network.edges(data=True))
 
+class CopyStream(object):
+    '''File-like object reading rows as PostgreSQL COPY text format.
+
+    Rows are formatted as COPY reads them, so only one read worth of rows is
+    held in memory rather than the whole table.
+
+    '''
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buf = ''
+
+    def read(self, size=-1):
+        lines = [self.buf]
+        length = len(self.buf)
+        for row in self.rows:
+            line = '\t'.join([_copy_value(v) for v in row]) + '\n'
+            lines.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        data = ''.join(lines)
+        if 0 <= size < len(data):
+            data, self.buf = data[:size], data[size:]
+        else:
+            self.buf = ''
+        return data
+
+def copy_features(cursor, lyr, columns, rows):
+    '''Load rows into the table behind an OGR layer with a single COPY.
+
+    Rows are streamed to the database as they are produced, so rows may be a
+    generator.
+
+    cursor - DB-API cursor on the same database as lyr
+    lyr - layer created in database
+    columns - list of column names, in row order
+    rows - iterable of row sequences (geometry as hex WKB)
+
+    '''
+    sql = 'COPY %s (%s) FROM STDIN' % (_quote_ident(lyr.GetName()),
+                                      ', '.join([_quote_ident(c) for c in columns]))
+    cursor.copy_expert(sql, CopyStream(rows))
+
+# GIST indexes of a table, other than those backing constraints
+_SPATIAL_INDEX_SQL = '''SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+JOIN pg_am am ON am.oid = c.relam
+WHERE i.indrelid = %s::regclass AND am.amname = 'gist'
+AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = i.indexrelid)'''
+
+def drop_spatial_indexes(cursor, tables):
+    '''Drop the GIST indexes of tables before a bulk load.
+
+    Returns a dict of table name to the definitions of its dropped indexes,
+    to be rebuilt in one pass with create_indexes once the rows are loaded.
+
+    cursor - DB-API cursor
+    tables - list of quoted table names
+
+    '''
+    indexdefs = {}
+    for table in tables:
+        cursor.execute(_SPATIAL_INDEX_SQL, (table,))
+        indexes = cursor.fetchall()
+        for name, indexdef in indexes:
+            cursor.execute('DROP INDEX %s' % name)
+        indexdefs[table] = [indexdef for name, indexdef in indexes]
+    return indexdefs
+
+def create_indexes(cursor, indexdefs):
+    '''Recreate indexes dropped by drop_spatial_indexes and analyze the tables.
+
+    cursor - DB-API cursor
+    indexdefs - dict of table name to index definitions
+
+    '''
+    for table, definitions in indexdefs.items():
+        for indexdef in definitions:
+            cursor.execute(indexdef)
+        cursor.execute('ANALYZE %s' % table)
+
+def set_fid_sequences(cursor, fids):
+    '''Move FID sequences past FIDs loaded by COPY.
+
+    Where rows are loaded with their FIDs given, the FID column sequence is
+    not used, so set it once afterwards rather than drawing a value per row.
+
+    cursor - DB-API cursor
+    fids - list of (layer, highest FID loaded) tuples
+
+    '''
+    for lyr, fid in fids:
+        if fid > 0:
+            cursor.execute('SELECT setval(pg_get_serial_sequence(%s, %s), %s)',
+                           (_quote_ident(lyr.GetName()), lyr.GetFIDColumn(), fid))
 
-def write_pg(conn, network, tablename_prefix, overwrite=False):
+def copy_tables(cursor, loads, fids=()):
+    '''Load tables with COPY, building their spatial indexes afterwards.
+
+    cursor - DB-API cursor on the same database as the layers
+    loads - list of (layer, column names, rows) tuples, see copy_features
+    fids - list of (layer, highest FID loaded) tuples, see set_fid_sequences
+
+    '''
+    indexdefs = drop_spatial_indexes(
+        cursor, [_quote_ident(lyr.GetName()) for lyr, columns, rows in loads])
+    for lyr, columns, rows in loads:
+        copy_features(cursor, lyr, columns, rows)
+    create_indexes(cursor, indexdefs)
+    set_fid_sequences(cursor, fids)
+
+def run_in_transaction(conn, function, *args):
+    '''Call function(cursor, *args) in one transaction on a pooled connection.
+
+    Returns the result of function. The transaction is rolled back if it
+    raises, otherwise committed.
+
+    conn - OGR database connection, see get_dbapi_connection
+
+    '''
+    dbapi_conn = get_dbapi_connection(conn)
+    cursor = dbapi_conn.cursor()
+    try:
+        result = function(cursor, *args)
+    except:
+        dbapi_conn.rollback()
+        raise
+    else:
+        dbapi_conn.commit()
+        return result
+    finally:
+        cursor.close()
+        release_dbapi_connection(conn, dbapi_conn)
+
+def copy_pg(conn, network, nodes, edges, workers=1):
+    '''Bulk load network nodes and edges into PostGIS tables using COPY.
+
+    Edge attribute fields are created on the edge layer first, then nodes
+    and edges are each loaded with one COPY inside a single transaction.
+    FIDs are numbered from 1 in the rows themselves and the FID sequences set
+    once afterwards. GIST indexes are dropped before loading and rebuilt once
+    afterwards.
+
+    With more than one worker the rows are split into chunks which are
+    loaded in parallel, each chunk with its own COPY on its own pooled
+    connection. Each chunk commits on its own, so a failure can leave
+    some chunks loaded. The dropped indexes are rebuilt whether or not every
+    chunk loads.
+
+    conn - OGR database connection (or DB-API connection) to the database holding the layers
+    network - networkx network type
+    nodes - OGR layer for nodes
+    edges - OGR layer for edges
+    workers - integer, number of threads loading chunks in parallel (at most POOL_MAX_CONNECTIONS)
+
+    '''
+    G = network
+
+    # Create all edge fields before loading so the COPY column list is known
+    schema = collect_schema(data for u, v, data in iter_edges(G))
+    columns = create_fields(edges, schema)
+
+    # Make sure OGR has issued the CREATE TABLE for both layers
+    nodes.SyncToDisk()
+    edges.SyncToDisk()
+
+    # FIDs are numbered here, so the FID sequence is only set once at the end
+    node_rows = ((fid, wkb_hex(n, data)) for fid, (n, data)
+                 in enumerate(iter_nodes(G), 1))
+    edge_rows = ([fid, wkb_hex((u, v), data)] +
+                 [_field_value(data.get(key), fieldtype) for key, fieldtype in schema]
+                 for fid, (u, v, data) in enumerate(iter_edges(G), 1))
+
+    node_columns = [nodes.GetFIDColumn(), nodes.GetGeometryColumn()]
+    edge_columns = [edges.GetFIDColumn(), edges.GetGeometryColumn()] + columns
+    fids = [(nodes, G.number_of_nodes()), (edges, G.number_of_edges())]
+
+    if workers > 1 and not hasattr(conn, 'cursor'):
+        # Each worker holds a pooled connection, more would raise PoolError
+        workers = min(workers, POOL_MAX_CONNECTIONS)
+        # Node and edge tables are independent, so all chunks run together
+        node_rows = list(node_rows)
+        edge_rows = list(edge_rows)
+        jobs = []
+        for lyr, lyr_columns, rows in ((nodes, node_columns, node_rows),
+                                       (edges, edge_columns, edge_rows)):
+            size = max(1, -(-len(rows) // workers))
+            for i in range(0, len(rows), size):
+                jobs.append((lyr, lyr_columns, rows[i:i+size]))
+        indexdefs = run_in_transaction(conn, drop_spatial_indexes,
+            [_quote_ident(nodes.GetName()), _quote_ident(edges.GetName())])
+        try:
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                futures = [executor.submit(run_in_transaction, conn,
+                                           copy_features, *job) for job in jobs]
+                for future in futures:
+                    future.result()
+        finally:
+            # Committed chunks stay loaded, so the tables always get their
+            # indexes and FID sequences back
+            run_in_transaction(conn, create_indexes, indexdefs)
+            run_in_transaction(conn, set_fid_sequences, fids)
+        return
+
+    run_in_transaction(conn, copy_tables, [(nodes, node_columns, node_rows),
+                                           (edges, edge_columns, edge_rows)],
+                       fids)
+
+def write_features(network, nodes, edges):
+    '''Write network nodes and edges as features of OGR layers.
+
+    network - networkx network type
+    nodes - OGR layer for nodes
+    edges - OGR layer for edges
+
+    '''
+    G = network
+
+    # One feature per layer, reused for every row
+    node_feature = ogr.Feature(nodes.GetLayerDefn())
+
+    # Get node geometry
+    #nodes
+    for n, data in iter_nodes(G):
+        g = netgeometry(n, data)
+        create_feature(g, nodes, feature=node_feature)
+    node_feature.Destroy()
+
+
+    # Create all edge fields up front, then write the edges
+    schema = collect_schema(data for u, v, data in iter_edges(G))
+    create_fields(edges, schema)
+    keys = [key for key, fieldtype in schema]
+    count = edges.GetLayerDefn().GetFieldCount()
+    indexes = list(range(count - len(keys), count))
+    edge_feature = ogr.Feature(edges.GetLayerDefn())
+
+    #edges
+    for u, v, data in iter_edges(G):
+
+        g = netgeometry((u, v), data)
+
+        # Fixed width row of single feature's attributes, in schema order.
+        # Keys the edge does not have are None, never a previous edge's value.
+        row = [data.get(key) for key in keys]
+        create_feature(g, edges, dict(zip(indexes, row)), edge_feature)
+    edge_feature.Destroy()
+
+def write_pg(conn, network, tablename_prefix, overwrite=False, bulk=False,
+             copy_mode=True, workers=1):
     '''Write NetworkX instance to PostGIS edge and node tables.
 
     network - networkx network type
     tablename_prefix - prefix for tables written to PostGIS i.e. a name for the network
     overwrite - boolean, if true tables of same name as <tablename_prefix>_Nodes and <tablename_prefix>_Edges will be overwritten
+    bulk - boolean, if true and psycopg2 is available nodes and edges are loaded with COPY over a psycopg2 connection instead of through OGR (default False)
+    workers - integer, if more than 1 the bulk COPY load is split across this many threads and pooled connections (chunks commit separately)
+    copy_mode - boolean, if true the OGR PostgreSQL driver is switched to COPY (PG_USE_COPY) when features are written through OGR. Set to false if immediate FID feedback is needed.
 
     '''
 
@@ -493,51 +1060,32 @@ def write_pg(conn, network, tablename_prefix, overwrite=False):
         except:
             pass
 
-    # Create the tables for edges and nodes
-    edges = conn.CreateLayer(tbledges, None, ogr.wkbLineString)
-    nodes = conn.CreateLayer(tblnodes, None, ogr.wkbPoint)
-    # Get node geometry
-    #nodes
-    for n in G:
-        data = list(G.node[n].values()) or [{}]
-
-        #why are we passing data[0] to the netgeometry function?
-        #if the nodes ever have any data this will likely fail - as is the case with the gas network.
-
-        g = netgeometry(n, data[0])
-        create_feature(g, nodes)
-
-
-    # Get edges and their attributes
-    fields = {}
-    attributes = {}
-    OGRTypes = {int:ogr.OFTInteger, str:ogr.OFTString, float:ogr.OFTReal}
+    # Have the OGR driver use COPY rather than one INSERT per feature. The
+    # option is read when layers are created, so set it beforehand.
+    if copy_mode is True:
+        use_copy = gdal.GetConfigOption('PG_USE_COPY')
+        gdal.SetConfigOption('PG_USE_COPY', 'YES')
+    try:
+        # Create the tables for edges and nodes
+        edges = conn.CreateLayer(tbledges, None, ogr.wkbLineString)
+        nodes = conn.CreateLayer(tblnodes, None, ogr.wkbPoint)
+
+        # Bulk load via COPY where a DB-API connection can be made
+        if bulk is True and has_dbapi_connection(conn):
+            copy_pg(conn, G, nodes, edges, workers)
+        else:
+            # Single transaction, COPY buffers are flushed on commit
+            conn.StartTransaction()
+            try:
+                write_features(G, nodes, edges)
+            except:
+                conn.RollbackTransaction()
+                raise
+            else:
+                conn.CommitTransaction()
+    finally:
+        if copy_mode is True:
+            gdal.SetConfigOption('PG_USE_COPY', use_copy)
 
-    #edges
-    for e in G.edges(data=True):
-
-        data = G.get_edge_data(*e)
-        g = netgeometry(e, data)
-
-        # Loop through data in edges
-        #attribute key
-        for key, data in e[2].items():
-            # Reject data not for attribute table
-            if (key != 'Json' and key != 'Wkt' and key != 'Wkb'
-                and key != 'ShpName'):
-                  # Add new attributes for each feature
-                if key not in fields:
-                    if type(data) in OGRTypes:
-                        fields[key] = OGRTypes[type(data)]
-                    else:
-                        fields[key] = ogr.OFTString
-                    newfield = ogr.FieldDefn(key, fields[key])
-                    edges.CreateField(newfield)
-                    attributes[key] = data
-                  # Create dict of single feature's attributes
-                else:
-                    attributes[key] = data
-         # Create the re(g, edges, attributes)
-        create_feature(g, edges, attributes)
     # Destroy nodes and edges features as per OGR recommendations.
     nodes, edges = None, None
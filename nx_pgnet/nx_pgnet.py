@@ -296,9 +296,10 @@ Export to JSON (spatial and aspatial):
 
 B{Dependencies}
 
-Python 2.6 or later
+Python 3
 NetworkX 1.6 or later
 OGR 1.8.0 or later
+psycopg2 (optional, used to stream csv files to and from the database with COPY)
 
 B{Copyright (C)}
 
@@ -350,8 +351,28 @@ import networkx as nx
 import osgeo.ogr as ogr
 import osgeo.gdal as gdal
 import csv
+import itertools
 import re
+import ast
+import binascii
 import json
+import weakref
+
+#the psycopg2 connection pool, the COPY index helpers and the geometry
+#exporters are shared with nx_pg
+from .nx_pg import get_dbapi_connection, release_dbapi_connection, drop_spatial_indexes, create_indexes, _GEOM_EXPORTERS
+
+#orjson is optional, it is used to write json files
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+#pandas is optional, without it gephi csv files are read with the csv module
+try:
+	import pandas
+except ImportError:
+	pandas = None
 
 #new
 #from geoserver.catalog import Catalog
@@ -359,6 +380,70 @@ import json
 # Ask ogr to use Python exceptions rather than stderr messages.
 ogr.UseExceptions()
 
+# Attribute keys not written as fields by write.create_attribute_map, these
+# hold geometry or are assigned by the network schema.
+_ATTRIBUTE_MAP_SKIP_KEYS = frozenset(('Json', 'Wkt', 'Wkb', 'ShpName',
+	'NodeID', 'nodeid', 'EdgeID', 'edgeid', 'viewid', 'view_id', 'ViewID',
+	'View_ID', 'GeomID', 'geomid', 'geom', 'geom_text'))
+
+# Attribute keys not written as fields by write.add_attribute_fields.
+_ATTRIBUTE_FIELD_SKIP_KEYS = frozenset(('Json', 'Wkt', 'Wkb', 'ShpName',
+	'nodeid', 'edgeid', 'viewid', 'view_id', 'geomid', 'GeomID', 'EdgeID',
+	'NodeID', 'geom_text'))
+
+# OGR field types for Python attribute types, anything else is a string.
+_OGR_TYPES = {int:ogr.OFTInteger, str:ogr.OFTString, float:ogr.OFTReal}
+
+# 2D point wkt, read without building an OGR geometry. Anything else
+# (e.g. 3D or EMPTY) is left to ogr.CreateGeometryFromWkt.
+_WKT_NUMBER = r'([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+_WKT_POINT = re.compile(r'\s*POINT\s*\(\s*%s\s+%s\s*\)\s*$' % (_WKT_NUMBER, _WKT_NUMBER), re.IGNORECASE)
+# '(x, y)' node ids, as written for spatial networks by pajek and graphml.
+_COORDINATES = re.compile(r'\s*\(\s*%s\s*,\s*%s\s*\)\s*$' % (_WKT_NUMBER, _WKT_NUMBER))
+# First and last points of 2D linestring wkt, likewise.
+_WKT_LINE_ENDS = re.compile(r'\s*LINESTRING\s*\(\s*%s\s+%s\s*,(?:.*,)?\s*%s\s+%s\s*\)\s*$' % ((_WKT_NUMBER,) * 4), re.IGNORECASE | re.DOTALL)
+
+# key='value' or key=value pairs of an ogr PostgreSQL connection string.
+_CONNECTION_PARAMETER = re.compile(r"(\w+)\s*=\s*(?:'([^']*)'|([^\s']\S*))")
+
+# PostgreSQL types of attribute values nisql.node_attribute_equality_check
+# can compare, by Python type.
+_PG_TYPES = {str:'text', int:'integer', float:'float', bool:'boolean'}
+
+# Read buffer size of csv files, in bytes.
+_CSV_BUFFER_SIZE = 1 << 20
+
+# Columns of gephi csv files not copied to node or edge attributes.
+_GEPHI_NODE_SKIP_COLUMNS = ('NodeID', 'view_id', 'GraphID', 'wgs84_node_x',
+	'wgs84_node_y', 'google_node_x', 'google_node_y')
+_GEPHI_EDGE_SKIP_COLUMNS = ('GraphID', 'Edge_GeomID', 'EdgeID', 'Node_F_ID',
+	'Node_T_ID', 'view_id', 'google_startpoint_x', 'google_startpoint_y',
+	'google_endpoint_x', 'google_endpoint_y', 'wgs84_startpoint_x',
+	'wgs84_startpoint_y', 'wgs84_endpoint_x', 'wgs84_endpoint_y')
+# Columns of aspatial gephi edge files naming the nodes of each edge.
+_GEPHI_ENDPOINT_COLUMNS = frozenset(('Node_F_ID', 'Node_T_ID', 'Source', 'Target'))
+
+# Attribute keys export_graph leaves out of written files, binary wkb can not
+# be written by the NetworkX writers, and json also duplicates the wkt.
+_EXPORT_SKIP_KEYS = frozenset(('Wkb',))
+_JSON_EXPORT_SKIP_KEYS = frozenset(('Wkb', 'Json'))
+
+# GraphML writer, NetworkX 2.0 and later can write elements to the file as
+# they are made with lxml (and fall back to the tree writer without it).
+_write_graphml = getattr(nx, 'write_graphml_lxml', nx.write_graphml)
+
+# Graph classes import_graph can copy a graph read by NetworkX into.
+_GRAPH_CLASSES = (nx.Graph, nx.DiGraph, nx.MultiGraph, nx.MultiDiGraph)
+
+# Number of nodes or edges import_graph.import_from_json adds to a graph in one call.
+JSON_BATCH_SIZE = 10000
+
+# Number of edge rows write.pgnet sends in one multi-row INSERT.
+EDGE_BATCH_SIZE = 1000
+
+# Number of node rows write.pgnet sends in one multi-row INSERT.
+NODE_BATCH_SIZE = 1000
+
 class Error(Exception):
 	'''Class to handle network IO errors. '''
 	# Error class.
@@ -369,6 +454,253 @@ class Error(Exception):
 	def __str__(self):
 		return repr(self.parameter)
 
+#names of statements nisql has found prepared in the session of each ogr connection
+_prepared = weakref.WeakKeyDictionary()
+
+#names of functions nisql.sql_function_check has found on each ogr connection
+_functions = weakref.WeakKeyDictionary()
+
+def _quote(value):
+	'''Return value as an SQL literal, numbers as they are and anything
+	else (e.g. wkt or an OGR geometry) as a quoted string.
+
+	value - value to quote
+
+	'''
+	if isinstance(value, (int, float)):
+		return repr(value)
+	return "'%s'" % str(value).replace("'", "''")
+
+def _hex_wkb(geom):
+	'''Return an OGR geometry as little endian hex wkb, the same string as
+	encode(ST_AsBinary(geom, 'NDR'), 'hex') in PostGIS. Unlike wkt it keeps
+	coordinates exact.
+
+	geom - OGR geometry
+
+	'''
+	return binascii.hexlify(bytes(geom.ExportToWkb(ogr.wkbNDR))).decode('ascii')
+
+def _parse_coordinates(text):
+	'''Return the coordinate tuple of a node id such as '(100, 100.5)'.
+
+	Numbers are int or float as written, as Python would read them. Any other
+	literal is read with ast.literal_eval.
+
+	text - string - node id
+
+	'''
+	coordinates = _COORDINATES.match(text)
+	if coordinates is None:
+		return ast.literal_eval(text)
+	return tuple(float(value) if ('.' in value or 'e' in value or 'E' in value) else int(value)
+		for value in coordinates.groups())
+
+def _wkt_point_xy(wkt):
+	'''Return the (x, y) coordinates of point wkt.
+
+	2D points are read with _WKT_POINT, anything else with OGR.
+
+	wkt - string - point geometry as wkt
+
+	'''
+	point = _WKT_POINT.match(wkt)
+	if point is not None:
+		return float(point.group(1)), float(point.group(2))
+	geom = ogr.CreateGeometryFromWkt(wkt)
+	return geom.GetX(), geom.GetY()
+
+def _wkt_line_ends(wkt):
+	'''Return the first and last (x, y) coordinates of linestring wkt.
+
+	2D linestrings are read with _WKT_LINE_ENDS, anything else with OGR.
+
+	wkt - string - linestring geometry as wkt
+
+	'''
+	line_ends = _WKT_LINE_ENDS.match(wkt)
+	if line_ends is not None:
+		x1, y1, x2, y2 = [float(value) for value in line_ends.groups()]
+		return (x1, y1), (x2, y2)
+	geom = ogr.CreateGeometryFromWkt(wkt)
+	return geom.GetPoint_2D(0), geom.GetPoint_2D(geom.GetPointCount()-1)
+
+def _read_csv(path, geometry_key, skip_columns):
+	'''Return the geometry text and attribute dictionary of each row of a csv file.
+
+	Returns (geometries, records), geometries is None if the file has no
+	geometry_key column. All values are read as strings, and the columns in
+	skip_columns are left out of the records.
+
+	path - string - path to csv file
+	geometry_key - string - column name of WKT geometry
+	skip_columns - sequence - column names not copied to records
+
+	'''
+	if pandas is not None:
+		try:
+			frame = pandas.read_csv(path, dtype=str, keep_default_na=False, engine='c', encoding='utf-8')
+		except pandas.errors.EmptyDataError:
+			return None, []
+		if geometry_key in frame.columns:
+			geometries = frame[geometry_key].tolist()
+		else:
+			geometries = None
+		frame.drop(columns=[column for column in skip_columns if column in frame.columns], inplace=True)
+		return geometries, frame.to_dict(orient='records')
+
+	with open(path, 'r', newline='', buffering=_CSV_BUFFER_SIZE, encoding='utf-8') as csv_file:
+		csv_reader = csv.reader(csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
+		header = next(csv_reader, [])
+		rows = list(csv_reader)
+	if geometry_key in header:
+		geometry_index = header.index(geometry_key)
+		geometries = [row[geometry_index] for row in rows]
+	else:
+		geometries = None
+	keep = [index for index, column in enumerate(header) if column not in skip_columns]
+	keep_header = [header[index] for index in keep]
+	records = [dict(zip(keep_header, [row[index] for index in keep])) for row in rows]
+	return geometries, records
+
+def _export_copy(graph, skip_keys=(), none_to_string=False):
+	'''Return a copy of graph to pass to a NetworkX writer.
+
+	Unlike graph.copy() nothing is deep copied, each node and edge gets a
+	shallow copy of its attribute dict without the keys in skip_keys.
+
+	graph - networkx graph
+	skip_keys - frozenset - attribute keys to leave out e.g. _EXPORT_SKIP_KEYS
+	none_to_string - boolean - if true, None attribute values become 'None'
+
+	'''
+	if none_to_string:
+		def attributes(data):
+			return {key: 'None' if value is None else value for key, value in data.items() if key not in skip_keys}
+	else:
+		def attributes(data):
+			return {key: value for key, value in data.items() if key not in skip_keys}
+
+	export = graph.__class__()
+	export.graph.update(graph.graph)
+	export.add_nodes_from((node, attributes(data)) for node, data in graph.nodes(data=True))
+	if graph.is_multigraph():
+		export.add_edges_from((u, v, key, attributes(data)) for u, v, key, data in graph.edges(keys=True, data=True))
+	else:
+		export.add_edges_from((u, v, attributes(data)) for u, v, data in graph.edges(data=True))
+	return export
+
+class _PajekView(object):
+	'''Read only view of a spatial graph for nx.write_pajek.
+
+	Node and edge attribute dicts are built as nx.write_pajek asks for them,
+	instead of copying the whole graph. Nodes get x and y from their
+	coordinate key and an optional label, edges only get a weight.
+
+	graph - networkx graph - nodes keyed by coordinates e.g. (100,100)
+	node_attribute_label - string - name of node attribute to write as label
+	edge_attribute_weight - string or value - name of edge attribute to use as weight, or a value to apply to all edges
+
+	'''
+	def __init__(self, graph, name, node_attribute_label, edge_attribute_weight):
+		self.graph = graph
+		self.name = name
+		self.node_attribute_label = node_attribute_label
+		#no label is written when node_attribute_label is None or an empty string
+		self.use_label = node_attribute_label not in (None, '')
+		self.label_key = str(node_attribute_label)
+		self.edge_attribute_weight = edge_attribute_weight
+
+	@property
+	def node(self):
+		#nx.write_pajek looks node attributes up with G.node.get(n, {})
+		return self
+
+	def get(self, node, default=None):
+		if node not in self.graph:
+			return default
+		data = {'x': float(node[0]), 'y': float(node[1])}
+		if self.use_label:
+			data[self.label_key] = str(self.graph.node[node][self.node_attribute_label]).strip()
+		return data
+
+	def nodes(self, data=False):
+		if data:
+			return ((node, self.get(node)) for node in self.graph.nodes())
+		return self.graph.nodes()
+
+	def edges(self, data=False):
+		if not data:
+			return self.graph.edges()
+		weight = self.edge_attribute_weight
+		#user has specified an attribute name to use as values for edge weights
+		if type(weight) == str:
+			return ((u, v, {'weight': edge_data[weight]}) for u, v, edge_data in self.graph.edges(data=True))
+		#user has supplied a constant value
+		return ((u, v, {'weight': weight}) for u, v in self.graph.edges())
+
+	def order(self):
+		return self.graph.order()
+
+	def is_directed(self):
+		return self.graph.is_directed()
+
+	def is_multigraph(self):
+		return self.graph.is_multigraph()
+
+def _json_dumps(value):
+	'''Return value serialized as json bytes, with orjson when it is installed.
+
+	orjson refuses integers wider than 64 bits, such as the uuid4 keys and
+	uuid attributes of multigraphs, so those values are left to json.
+
+	'''
+	if orjson is not None:
+		try:
+			return orjson.dumps(value)
+		except TypeError:
+			pass
+	return json.dumps(value).encode('utf-8')
+
+def _write_node_link_json(graph, json_file, skip_keys=()):
+	'''Write graph to json_file in NetworkX node-link format.
+
+	The same data as json.dumps(json_graph.node_link_data(graph)) is written
+	(whitespace aside), one node or link at a time, so neither a copy of the graph nor
+	the whole document is held in memory.
+
+	graph - networkx graph
+	json_file - file opened in binary mode
+	skip_keys - frozenset - node and edge attribute keys to leave out
+
+	'''
+	multigraph = graph.is_multigraph()
+	json_file.write(b'{"directed": ' + _json_dumps(graph.is_directed()))
+	json_file.write(b', "multigraph": ' + _json_dumps(multigraph))
+	json_file.write(b', "graph": ' + _json_dumps(graph.graph))
+
+	#position of each node in the nodes array, links refer to nodes by it
+	mapping = {}
+	json_file.write(b', "nodes": [')
+	for index, (node, data) in enumerate(graph.nodes(data=True)):
+		mapping[node] = index
+		node_data = {key: value for key, value in data.items() if key not in skip_keys}
+		node_data['id'] = node
+		json_file.write((b', ' if index else b'') + _json_dumps(node_data))
+
+	json_file.write(b'], "links": [')
+	if multigraph:
+		edges = graph.edges(keys=True, data=True)
+	else:
+		edges = graph.edges(data=True)
+	for index, edge in enumerate(edges):
+		link_data = {key: value for key, value in edge[-1].items() if key not in skip_keys}
+		link_data['source'] = mapping[edge[0]]
+		link_data['target'] = mapping[edge[1]]
+		if multigraph:
+			link_data['key'] = edge[2]
+		json_file.write((b', ' if index else b'') + _json_dumps(link_data))
+	json_file.write(b']}')
 
 class nisql:
 	'''Contains wrappers for PostGIS network schema functions.
@@ -386,19 +718,82 @@ class nisql:
 		if self.conn == None:
 			raise Error('No connection to database.')
 
+	def _scalar(self, sql, field=0):
+		'''Execute sql and return one field of its first row, or None if there is no row.
+
+		The result set is released before returning.
+
+		sql - string - SQL statement returning a single row e.g. a ni_* function call
+		field - string or integer - name or index of field to return
+
+		'''
+		result = self.conn.ExecuteSQL(sql)
+		if result is None:
+			return None
+		try:
+			row = result.GetNextFeature()
+			if row is None:
+				return None
+			return row.GetField(field)
+		finally:
+			self.conn.ReleaseResultSet(result)
+
+	def _execute(self, name, function, types, args):
+		'''Call a network schema function and return its result.
+
+		The call is prepared on the connection the first time and then run
+		with EXECUTE, so it is not parsed and planned again per node or edge.
+		Prepared statements belong to the server session rather than to the
+		ogr connection object, so before preparing, the session is checked
+		(pg_prepared_statements) for a statement of the same name to reuse.
+
+		name - string - name of prepared statement
+		function - string - name of function e.g. ni_node_geometry_equality_check
+		types - tuple - PostgreSQL types of the function arguments
+		args - tuple - argument values
+
+		'''
+		values = [_quote(arg) for arg in args]
+		try:
+			prepared = _prepared.setdefault(self.conn, set())
+		except TypeError:
+			# connection can not be tracked, call the function directly
+			sql = ("SELECT * FROM %s(%s);" % (function, ', '.join('%s::%s' % (value, type_) for value, type_ in zip(values, types))))
+			return self._scalar(sql, function)
+		if name not in prepared:
+			if not self._scalar("SELECT count(*) FROM pg_prepared_statements WHERE name = %s;" % _quote(name.lower())):
+				params = ', '.join('$%i' % (i + 1) for i in range(len(types)))
+				self.conn.ExecuteSQL("PREPARE %s (%s) AS SELECT * FROM %s(%s);" % (name, ', '.join(types), function, params))
+			prepared.add(name)
+		return self._scalar("EXECUTE %s(%s);" % (name, ', '.join(values)), function)
+
 	def sql_function_check(self, function_name):
 		'''Checks Postgres database for existence of specified function,
 			if not found raises error.
 
+		Functions found are remembered for the connection, the first check
+		finds all network schema (ni_) functions in one query.
+
 		function_name - string - name of function to check database for
 
 		'''
+		try:
+			functions = _functions.setdefault(self.conn, set())
+		except TypeError:
+			# connection can not be tracked, check every time
+			functions = set()
+
+		if function_name not in functions:
+			sql = ("SELECT DISTINCT proname FROM pg_proc WHERE proname LIKE 'ni\\_%%' OR proname = %s;" % (_quote(function_name)))
+			result = self.conn.ExecuteSQL(sql)
+			if result is not None:
+				try:
+					for row in result:
+						functions.add(row.GetField(0))
+				finally:
+					self.conn.ReleaseResultSet(result)
 
-		sql = ("SELECT * FROM pg_proc WHERE proname = '%s';" % (function_name))
-		result = None
-		for row in self.conn.ExecuteSQL(sql):
-			result = row
-		if result == None:
+		if function_name not in functions:
 			raise Error('Database error: SQL function %s does not exist.' %
 							function_name)
 		else:
@@ -421,14 +816,9 @@ class nisql:
 		'''
 
 		# Create network tables
-		sql = ("SELECT * FROM ni_create_network_tables ('%s', %i, CAST(%i AS BOOLEAN), CAST(%i AS BOOLEAN));" % (prefix, epsg, directed, multigraph))
+		sql = ("SELECT * FROM ni_create_network_tables (%s, %i, CAST(%i AS BOOLEAN), CAST(%i AS BOOLEAN));" % (_quote(prefix), epsg, directed, multigraph))
 		
-		result = None
-		for row in self.conn.ExecuteSQL(sql):
-
-			result = row.ni_create_network_tables
-
-		return result
+		return self._scalar(sql, 'ni_create_network_tables')
 
 	def create_node_view(self, prefix):
 		'''Wrapper for ni_create_node_view function.
@@ -444,10 +834,8 @@ class nisql:
 
 		'''
 
-		viewname = None
-		sql = "SELECT * FROM ni_create_node_view('%s')" % prefix
-		for row in self.conn.ExecuteSQL(sql):
-			viewname = row.ni_create_node_view
+		sql = "SELECT * FROM ni_create_node_view(%s)" % _quote(prefix)
+		viewname = self._scalar(sql, 'ni_create_node_view')
 		if viewname == None:
 			raise Error("Could not create node view for network %s" % (prefix))
 		return viewname
@@ -463,11 +851,8 @@ class nisql:
 		prefix - string - network name / table prefix
 
 		'''
-		viewname = None
-		sql = ("SELECT * FROM ni_create_edge_view('%s')" % (prefix))
-
-		for row in self.conn.ExecuteSQL(sql):
-			viewname = row.ni_create_edge_view
+		sql = ("SELECT * FROM ni_create_edge_view(%s)" % (_quote(prefix)))
+		viewname = self._scalar(sql, 'ni_create_edge_view')
 		if viewname == None:
 			raise Error("Could not create edge view for network %s" % (prefix))
 		return viewname
@@ -485,20 +870,9 @@ class nisql:
 		multigraph - boolean - true if a multigraph network will be written, false otherwise
 		'''
 
-		if ((directed==False) and (multigraph == False)):
-			sql = ("SELECT * FROM ni_add_graph_record('%s', FALSE, FALSE);" % (prefix))
-
-		elif ((directed == False) and (multigraph == True)):
-			sql = ("SELECT * FROM ni_add_graph_record('%s', FALSE, TRUE);" % (prefix))
-
-		elif ((directed == True) and (multigraph == False)):
-			sql = ("SELECT * FROM ni_add_graph_record('%s', TRUE, FALSE);" % (prefix))
-
-		elif ((directed == True) and (multigraph == True)):
-			sql = ("SELECT * FROM ni_add_graph_record('%s', TRUE, TRUE);" % (prefix))
+		sql = ("SELECT * FROM ni_add_graph_record(%s, %s, %s);" % (_quote(prefix), 'TRUE' if directed else 'FALSE', 'TRUE' if multigraph else 'FALSE'))
 
-		result = self.conn.ExecuteSQL(sql)
-		return result
+		return self._scalar(sql, 'ni_add_graph_record')
 
 	def ni_node_snap_geometry_equality_check(self, prefix, wkt, srs=27700, snap=0.1):
 		'''Wrapper for ni_node_snap_geometry_equality_check function.
@@ -513,13 +887,8 @@ class nisql:
 		snap - float - snapping precision value
 
 		'''
-		sql = ("SELECT * FROM ni_node_snap_geometry_equality_check('%s', '%s', %s, %s);" % (prefix, wkt, srs, snap))
-		result = None
-
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.ni_node_snap_geometry_equality_check
-
-		return result
+		return self._execute('nisql_node_snap_geometry', 'ni_node_snap_geometry_equality_check',
+			('varchar', 'varchar', 'integer', 'float'), (prefix, wkt, srs, snap))
 
 	def node_attribute_equality_check(self, prefix, node_attribute_equality_key, node_attribute_equality_value):
 		'''
@@ -533,22 +902,13 @@ class nisql:
 		node_attribute_equality_key - string - name of a key (must exist in node table) to check against
 		node_attribute_equality_value - unknown type - value to check against
 		'''
-		#need to map python types to PostgreSQL types (currently only support string, integer, and float
-		if ((type(node_attribute_equality_value) == str) or (type(node_attribute_equality_value) == 'str')):
-			sql = ("SELECT * FROM ni_node_attribute_equality_check('%s', '%s', '%s'::text);" % (prefix, node_attribute_equality_key, node_attribute_equality_value))
-		elif ((type(node_attribute_equality_value) == int) or (type(node_attribute_equality_value) == 'int')):
-			sql = ("SELECT * FROM ni_node_attribute_equality_check('%s', '%s', %s::integer);" % (prefix, node_attribute_equality_key, node_attribute_equality_value))
-		elif ((type(node_attribute_equality_value) == float) or (type(node_attribute_equality_value) == 'float')):
-			sql = ("SELECT * FROM ni_node_attribute_equality_check('%s', '%s', %s::float);" % (prefix, node_attribute_equality_key, node_attribute_equality_value))
-		elif ((type(node_attribute_equality_value) == int) or (type(node_attribute_equality_value) == 'long')):
-			sql = ("SELECT * FROM ni_node_attribute_equality_check('%s', '%s', %s::long);" % (prefix, node_attribute_equality_key, node_attribute_equality_value))
-
-		result = None
+		#need to map python types to PostgreSQL types (currently only support string, integer, float and boolean)
+		value_type = _PG_TYPES.get(type(node_attribute_equality_value))
+		if value_type is None:
+			raise Error('Node attribute equality value type not supported: %s.' % type(node_attribute_equality_value))
 
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.ni_node_attribute_equality_check
-
-		return result
+		return self._execute('nisql_node_attribute_%s' % value_type, 'ni_node_attribute_equality_check',
+			('varchar', 'varchar', value_type), (prefix, node_attribute_equality_key, node_attribute_equality_value))
 
 	def node_geometry_equality_check(self, prefix, wkt, srs=27700):
 		'''Wrapper for ni_node_geometry_equality_check function.
@@ -563,12 +923,8 @@ class nisql:
 
 		'''
 
-		sql = ("SELECT * FROM ni_node_geometry_equality_check('%s', '%s', %s);" % (prefix, wkt, srs))
-		result = None
-
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.ni_node_geometry_equality_check
-		return result
+		return self._execute('nisql_node_geometry', 'ni_node_geometry_equality_check',
+			('varchar', 'varchar', 'integer'), (prefix, wkt, srs))
 
 	def ni_edge_snap_geometry_equality_check(self, prefix, wkt, srs=27700, snap=0.1):
 		'''Wrapper for ni_edge_snap_geometry_equality_check function.
@@ -584,13 +940,8 @@ class nisql:
 
 		'''
 
-		sql = ("SELECT * FROM ni_edge_snap_geometry_equality_check('%s', '%s', %s, %s);" % (prefix, wkt, srs, snap))
-		result = None
-
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.ni_edge_snap_geometry_equality_check
-
-		return result
+		return self._execute('nisql_edge_snap_geometry', 'ni_edge_snap_geometry_equality_check',
+			('varchar', 'varchar', 'integer', 'float'), (prefix, wkt, srs, snap))
 
 	def edge_geometry_equality_check(self, prefix, wkt, srs=27700):
 		'''Wrapper for ni_edge_geometry_equality_check function.
@@ -605,12 +956,8 @@ class nisql:
 
 		'''
 
-		sql = ("SELECT * FROM ni_edge_geometry_equality_check('%s', '%s', %s);" % (prefix, wkt, srs))
-
-		result = None
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.ni_edge_geometry_equality_check
-		return result
+		return self._execute('nisql_edge_geometry', 'ni_edge_geometry_equality_check',
+			('varchar', 'varchar', 'integer'), (prefix, wkt, srs))
 
 	def delete_network(self, prefix):
 		'''Wrapper for ni_delete_network function.
@@ -622,30 +969,54 @@ class nisql:
 
 		'''
 
-		sql = ("SELECT * FROM ni_delete_network('%s');" % (prefix))
-
-		result = None
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.ni_delete_network
+		sql = ("SELECT * FROM ni_delete_network(%s);" % (_quote(prefix)))
 
-		return result
+		return self._scalar(sql, 'ni_delete_network')
 
 	def graph_to_csv(self, prefix, output_path):
 		'''Wrapper for the ni_graph_to_csv function.
 
 		Outputs the tables related to the supplied prefix as .csv files, to the output path specified
 
+		The files are written by the database server, so output_path is a path
+		on the server. See graph_to_local_csv to write them on the client.
+
+		prefix - string - name of a network / graph as saved in the Graphs table
+		output_path - string - path on the database server to save files to
+
+		'''
+
+		sql = ("SELECT * FROM ni_graph_to_csv(%s, %s, %s);" % (_quote(prefix), _quote(prefix), _quote(output_path)))
+		return self._scalar(sql, 'ni_graph_to_csv')
+
+	def graph_to_local_csv(self, prefix, output_path):
+		'''Write the same .csv files as graph_to_csv to a path on the client.
+
+		The files and their queries come from the ni_graph_csv_queries
+		function, which ni_graph_to_csv also uses. Each query is read with
+		COPY ... TO STDOUT, which needs psycopg2.
+
 		prefix - string - name of a network / graph as saved in the Graphs table
-		output_path - string - path to save files to
+		output_path - string - path on this machine to save files to
 
 		'''
 
-		sql = ("SELECT * FROM ni_graph_to_csv('%s', '%s', '%s');" % (prefix, prefix, output_path))
+		dbapi_conn = get_dbapi_connection(self.conn)
+		if dbapi_conn is None:
+			raise Error('graph_to_local_csv needs psycopg2 and a PostgreSQL connection, use graph_to_csv to write the files on the database server.')
 
-		result = None
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.ni_graph_to_csv
-		return result
+		cursor = dbapi_conn.cursor()
+		try:
+			cursor.execute('SELECT csv_file_name, csv_query FROM ni_graph_csv_queries(%s, %s, %s)', (prefix, 'geom', prefix))
+			for filename, query in cursor.fetchall():
+				sql = "COPY (%s) TO STDOUT WITH DELIMITER ',' CSV HEADER" % query
+				with open(os.path.join(output_path, filename), 'w', newline='', encoding='utf-8') as csv_file:
+					cursor.copy_expert(sql, csv_file)
+		finally:
+			# nothing is changed, end the transaction before the connection is reused
+			dbapi_conn.rollback()
+			cursor.close()
+			release_dbapi_connection(self.conn, dbapi_conn)
 
 	def get_graph_id_by_prefix(self, prefix):
 		'''TODO - need to write the equivalent function in the database
@@ -656,11 +1027,8 @@ class nisql:
 
 		'''
 
-		sql = ("SELECT \"GraphID\" FROM \"Graphs\" WHERE \"GraphName\" = '%s'" % (prefix))
-		result = None
-		for row in self.conn.ExecuteSQL(sql):
-			result = row.GraphID
-		return result
+		sql = ("SELECT \"GraphID\" FROM \"Graphs\" WHERE \"GraphName\" = %s" % (_quote(prefix)))
+		return self._scalar(sql, 'GraphID')
 
 class import_graph:
 	'''
@@ -694,8 +1062,9 @@ class import_graph:
 			import json
 
 			#open input json file
-			with open(path) as data_file:
-				#read json data
+			with open(path, 'rb') as data_file:
+				#read json data, with json rather than orjson, which reads integers
+				#wider than 64 bits (e.g. multigraph uuid keys) as floats
 				json_data = json.load(data_file)
 
 				#get graph attributes
@@ -730,31 +1099,39 @@ class import_graph:
 				#check for nodes key
 				if 'nodes' in json_data:
 
+					#nodes are added to the graph JSON_BATCH_SIZE at a time
+					node_batch = []
+
 					#loop all nodes
 					for node in json_data['nodes']:
+						if len(node_batch) >= JSON_BATCH_SIZE:
+							graph.add_nodes_from(node_batch)
+							del node_batch[:]
+
 						if spatial == True:
 							if 'Wkt' in node:
 								node_wkt = node['Wkt']
 
-								#create a node geometry
-								node_geom = ogr.CreateGeometryFromWkt(node_wkt)
+								#node coordinates
+								node_x, node_y = _wkt_point_xy(node_wkt)
 
 								#node tuple containing node coordinates
-								node_tuple = '(%s, %s)' % (node_geom.GetX(), node_geom.GetY())
+								node_tuple = (node_x, node_y)
 
-								#add node
-								graph.add_node(node_tuple, node)
+								node_batch.append((node_tuple, node))
 							else:
 								raise Error ('The input json data (%s) does not contain a WKT parameter denoting the geometry of nodes in the network' % (path))
 						else:
 							if 'NodeID' in node:
 								node_id = node['NodeID']
 
-								#add node
-								graph.add_node(node_id, node)
+								node_batch.append((node_id, node))
 							else:
 								raise Error('The input json data (%s) does not contain a NodeID value' % (path))
 
+					#add the remaining nodes
+					graph.add_nodes_from(node_batch)
+
 					nodes = graph.nodes(data=True)
 				else:
 					raise Error('The input json data (%s) does not contain a nodes parameter.' % (path))
@@ -762,35 +1139,32 @@ class import_graph:
 				#check for links key
 				if 'links' in json_data:
 
+					#edges are added to the graph JSON_BATCH_SIZE at a time
+					edge_batch = []
+
 					#loop all edges
 					for edge in json_data['links']:
+						if len(edge_batch) >= JSON_BATCH_SIZE:
+							graph.add_edges_from(edge_batch)
+							del edge_batch[:]
+
 						if spatial == True:
 							if 'Wkt' in edge:
 								edge_wkt = edge['Wkt']
 
-								#create an edge geometry
-								edge_geom = ogr.CreateGeometryFromWkt(edge_wkt)
-
-								#point count
-								point_count = edge_geom.GetPointCount()
-
-								#startpoint geom
-								edge_startpoint_geom = edge_geom.GetPoint_2D(0)
-
-								#endpoint geom
-								edge_endpoint_geom = edge_geom.GetPoint_2D(point_count-1)
+								#startpoint and endpoint
+								edge_startpoint_geom, edge_endpoint_geom = _wkt_line_ends(edge_wkt)
 
 								#create tuples
-								start_point_edge_tuple = '(%s, %s)' % (edge_startpoint_geom[0], edge_startpoint_geom[1])
-								end_point_edge_tuple = '(%s, %s)' % (edge_endpoint_geom[0], edge_endpoint_geom[1])
+								start_point_edge_tuple = (edge_startpoint_geom[0], edge_startpoint_geom[1])
+								end_point_edge_tuple = (edge_endpoint_geom[0], edge_endpoint_geom[1])
 
-								#add an edge to the graph
 								if not multigraph:
-									graph.add_edge(start_point_edge_tuple, end_point_edge_tuple, edge)
+									edge_batch.append((start_point_edge_tuple, end_point_edge_tuple, edge))
 								else:
 									#unique key expected or multigraphs (always labelled uuid)
 									uuid = edge['uuid']
-									graph.add_edge(start_point_edge_tuple, end_point_edge_tuple, uuid, edge)
+									edge_batch.append((start_point_edge_tuple, end_point_edge_tuple, uuid, edge))
 							else:
 								raise Error ('The input json data (%s) does not contain a WKT parameter denoting the geometry of edges in the network' % (path))
 						else:
@@ -800,20 +1174,24 @@ class import_graph:
 								node_f_id = edge['Node_F_ID']
 								node_t_id = edge['Node_T_ID']
 
-								#add edge to the graph
 								if not multigraph:
-									graph.add_edge(node_f_id, node_t_id, edge)
+									edge_batch.append((node_f_id, node_t_id, edge))
 								else:
 									#unique key expected or multigraphs (always labelled uuid)
 									uuid = edge['uuid']
-									graph.add_edge(node_f_id, node_t_id, uuid, edge)
+									edge_batch.append((node_f_id, node_t_id, uuid, edge))
 
 							else:
 								raise Error('The input json data (%s) does not contain a NodeID value' % (path))
+
+					#add the remaining edges
+					graph.add_edges_from(edge_batch)
 				else:
 					raise Error('The input json data (%s) does not contain a links parameter.' % (path))
 
 			return graph
+		else:
+			raise Error('The specified path %s does not exist' % (path))
 
 	def import_from_gexf(self, path, graphname, node_type=str, relabel=False):
 		''' Import graph from Graph Exchange XML Format (GEXF)
@@ -826,15 +1204,17 @@ class import_graph:
 		'''
 
 		#check if path to GEXF file exists
-		if os.path.isfile(path):
-			#build network from raw gexf
-			graph_from_raw_gexf = nx.read_gexf(path, node_type=node_type, relabel=relabel)
-			#assign network name
-			graph_from_raw_gexf.graph['name'] = graphname
-			#return network
-			return graph_from_raw_gexf
-		else:
+		try:
+			gexf_file = open(path, 'rb')
+		except IOError:
 			raise Error('The specified path %s does not exist' % (path))
+		with gexf_file:
+			#build network from raw gexf
+			graph_from_raw_gexf = nx.read_gexf(gexf_file, node_type=node_type, relabel=relabel)
+		#assign network name
+		graph_from_raw_gexf.graph['name'] = graphname
+		#return network
+		return graph_from_raw_gexf
 
 	def import_from_pajek(self, path, graphname, spatial=True, encoding='utf-8'):
 		'''Import graph from pajek format (.net)
@@ -848,74 +1228,55 @@ class import_graph:
 		encoding - string - encoding option to
 
 		'''
-		#check if path to Pajek file exists
-		if os.path.isfile(path):
-			multigraph = False
-			#build network from raw gexf
-			graph_from_raw_pajek = nx.read_pajek(path, encoding=encoding)
-
-			#create an empty graph (based on the type generated from the graphml input file)
-			if isinstance(graph_from_raw_pajek, nx.classes.graph.Graph):
-				graph = nx.Graph(name=graphname)
-			elif isinstance(graph_from_raw_pajek, nx.classes.digraph.DiGraph):
-				graph = nx.DiGraph(name=graphname)
-			elif isinstance(graph_from_raw_pajek, nx.classes.multigraph.MultiGraph):
-				graph = nx.MultiGraph(name=graphname)
-				multigraph = True
-			elif isinstance(graph_from_raw_graphml, nx.classes.multidigraph.MultiDiGraph):
-				graph = nx.MultiDiGraph(name=graphname)
-				multigraph = True
-			else:
-				raise Error('There was an error whilst trying to recognise the type of graph to be created. The Pajek file supplied is read into NetworkX, and so must contain data to create a: undirected graph (nx.Graph), directed graph (nx.DiGraph), undirected multigraph (nx.MultiGraph), directed multigraph (nx.MultiGraph). The type found was %s' % (str(type(graph_from_raw_pajek))))
-
-			if spatial:
-
-				#read nodes from raw pajek network, and copy to output network
-				for node in graph_from_raw_pajek.nodes(data=True):
-					coordinates = node[0]
-					#convert to tuple
-					coordinates = eval(coordinates)
-					if len(node) > 0:
-						node_attributes = node[1]
-					else:
-						node_attributes = {}
-					#add a node, with attribute dictionary
-					graph.add_node(coordinates, node_attributes)
-
-				#read edges from raw pajek network, and copy to output network
-				for edge in graph_from_raw_pajek.edges(data=True):
-					st_coordinates = edge[0]
-					ed_coordinates = edge[1]
-					#convert to tuple(s)
-					st_coordinates = eval(st_coordinates)
-					ed_coordinates = eval(ed_coordinates)
+		#open the Pajek file, the error if it does not exist is raised here
+		try:
+			pajek_file = open(path, 'rb')
+		except IOError:
+			raise Error('The specified path %s does not exist' % (path))
+		with pajek_file:
+			#build network from raw pajek
+			graph_from_raw_pajek = nx.read_pajek(pajek_file, encoding=encoding)
+
+		#create an empty graph (of the type generated from the pajek input file)
+		if type(graph_from_raw_pajek) in _GRAPH_CLASSES:
+			graph = type(graph_from_raw_pajek)(name=graphname)
+			multigraph = graph.is_multigraph()
+		else:
+			raise Error('There was an error whilst trying to recognise the type of graph to be created. The Pajek file supplied is read into NetworkX, and so must contain data to create a: undirected graph (nx.Graph), directed graph (nx.DiGraph), undirected multigraph (nx.MultiGraph), directed multigraph (nx.MultiGraph). The type found was %s' % (str(type(graph_from_raw_pajek))))
 
-					#grab the attributes for that edge
-					if len(edge) > 1:
-						edge_attributes = edge[2]
-						#need to do something with the wkt
-						if 'Wkt' in edge_attributes:
-							wkt = edge_attributes['Wkt']
-						#need to do something with json
-						if 'Json' in edge_attributes:
-							json = edge_attributes['Json']
-					else:
-						edge_attributes = {}
+		if spatial:
 
-					#add an edge, and the attribute dictionary
-					if not multigraph:
-						graph.add_edge(st_coordinates, ed_coordinates, edge_attributes)
-					else:
-						uuid = edge_attributes['uuid']
-						graph.add_edge(st_coordinates, ed_coordinates, uuid, edge_attributes)
+			#coordinates by node id, each id is parsed once
+			node_coordinates = {}
+			#nodes and edges are collected, then added to the graph in one call each
+			nodes = []
 
-				#set the graph name
-				graph.graph['name'] = graphname
-				return graph
+			#read nodes from raw pajek network, and copy to output network
+			for node in graph_from_raw_pajek.nodes(data=True):
+				#convert to tuple
+				coordinates = _parse_coordinates(node[0])
+				node_coordinates[node[0]] = coordinates
+				if len(node) > 0:
+					node_attributes = node[1]
+				else:
+					node_attributes = {}
+				#add a node, with attribute dictionary
+				nodes.append((coordinates, node_attributes))
+			graph.add_nodes_from(nodes)
+
+			#read edges from raw pajek network, with the node ids converted to tuples, and copy to output network
+			if multigraph:
+				#keyed by uuid where there is one, otherwise NetworkX picks the key
+				edges = [(node_coordinates[u], node_coordinates[v], edge_attributes.get('uuid'), edge_attributes) for u, v, edge_attributes in graph_from_raw_pajek.edges(data=True)]
 			else:
-				return graph_from_raw_pajek
+				edges = [(node_coordinates[u], node_coordinates[v], edge_attributes) for u, v, edge_attributes in graph_from_raw_pajek.edges(data=True)]
+			graph.add_edges_from(edges)
+
+			#set the graph name
+			graph.graph['name'] = graphname
+			return graph
 		else:
-			raise Error('The specified path %s does not exist' % (path))
+			return graph_from_raw_pajek
 
 	def import_from_yaml(self, path, graphname):
 		'''Import graph from yaml format
@@ -948,57 +1309,43 @@ class import_graph:
 
 		#check if the path to the graphml file exists
 		if os.path.isfile(path):
-			multigraph = False
 			#create a graph by reading the raw graphml input file
 			graph_from_raw_graphml = nx.read_graphml(path)
 
 			if spatial:
 
-				#create an empty graph (based on the type generated from the graphml input file)
-				if isinstance(graph_from_raw_graphml, nx.classes.graph.Graph):
-					graph = nx.Graph(name=graphname)
-				elif isinstance(graph_from_raw_graphml, nx.classes.digraph.DiGraph):
-					graph = nx.DiGraph(name=graphname)
-				elif isinstance(graph_from_raw_graphml, nx.classes.multigraph.MultiGraph):
-					graph = nx.MultiGraph(name=graphname)
-					multigraph = True
-				elif isinstance(graph_from_raw_graphml, nx.classes.multidigraph.MultiDiGraph):
-					graph = nx.MultiDiGraph(name=graphname)
-					multigraph = True
+				#create an empty graph (of the type generated from the graphml input file)
+				if type(graph_from_raw_graphml) in _GRAPH_CLASSES:
+					graph = type(graph_from_raw_graphml)(name=graphname)
+					multigraph = graph.is_multigraph()
 				else:
 					raise Error('There was an error whilst trying to recognise the type of graph to be created. The GraphML file supplied is read into NetworkX, and so must contain data to create a: undirected graph (nx.Graph), directed graph (nx.DiGraph), undirected multigraph (nx.MultiGraph), directed multigraph (nx.MultiGraph). The type found was %s' % (str(type(graph_from_raw_graphml))))
 
+				#coordinates by node id, each id is parsed once
+				node_coordinates = {}
+				#nodes and edges are collected, then added to the graph in one call each
+				nodes = []
+
 				#can we make the changes to the node ids here i.e. convert from string to tuple?
 				for node in graph_from_raw_graphml.nodes(data=True):
-					coordinates = node[0]
 					#convert to tuple
-					coordinates = eval(coordinates)
+					coordinates = _parse_coordinates(node[0])
+					node_coordinates[node[0]] = coordinates
 					if len(node) > 0:
 						node_attributes = node[1]
 					else:
 						node_attributes = {}
 					#add a node, and attributes
-					graph.add_node(coordinates, node_attributes)
-
-				for edge in graph_from_raw_graphml.edges(data=True):
-					st_coordinates = edge[0]
-					ed_coordinates = edge[1]
-					#convert to tuple(s)
-					st_coordinates = eval(st_coordinates)
-					ed_coordinates = eval(ed_coordinates)
-
-					#grab the attributes for that edge
-					if len(edge) > 1:
-						edge_attributes = edge[2]
-					else:
-						edge_attributes = {}
+					nodes.append((coordinates, node_attributes))
+				graph.add_nodes_from(nodes)
 
-					#add an edge, and attributes
-					if not multigraph:
-						graph.add_edge(st_coordinates, ed_coordinates, edge_attributes)
-					else:
-						uuid = edge_attributes['uuid']
-						graph.add_edge(st_coordinates, ed_coordinates, uuid, edge_attributes)
+				#edges, with the node ids converted to tuples
+				if multigraph:
+					#keyed by uuid where there is one, otherwise NetworkX picks the key
+					edges = [(node_coordinates[u], node_coordinates[v], edge_attributes.get('uuid'), edge_attributes) for u, v, edge_attributes in graph_from_raw_graphml.edges(data=True)]
+				else:
+					edges = [(node_coordinates[u], node_coordinates[v], edge_attributes) for u, v, edge_attributes in graph_from_raw_graphml.edges(data=True)]
+				graph.add_edges_from(edges)
 
 				graph.graph['name'] = graphname
 				return graph
@@ -1055,313 +1402,77 @@ class import_graph:
 
 			csv.field_size_limit(sys.maxsize)
 
-			if spatial:
+			#nodes and edges are collected, then added to the graph in one call each
+			nodes = []
+			edges = []
 
-				#node csv file open
-				node_csv_file = open(node_file_path, 'r')
-				node_csv_reader = csv.reader(node_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
+			if spatial:
 
 				#geometry_text attribute should be a wkt version of the geometry representing either the node or the edge.
-
-				node_csv_first_line = True
-				node_header = []
-
-				#set default index for each column in csv file
-				NodeID_index = -1
-				view_id_index = -1
-				GraphID_index = -1
-				node_geometry_text_index = -1
-				wgs84_node_x_index = -1
-				wgs84_node_y_index = -1
-				google_node_x_index = -1
-				google_node_y_index = -1
-				node_raw_geometry_index = -1
-				#will store indices to remove from node attribute values
-				node_attr_value_indices_to_remove = []
-
-				for node_line in node_csv_reader:
-					if node_csv_first_line == True:
-						#get the header from the node file
-						node_header = list(node_line)
-
-						if node_file_geometry_text_key in node_header:
-							node_geometry_text_index = node_header.index('geometry_text')
-
-						if 'NodeID' in node_header:
-							NodeID_index = node_header.index('NodeID')
-							node_attr_value_indices_to_remove.append(NodeID_index)
-						if 'view_id' in node_header:
-							view_id_index = node_header.index('view_id')
-							node_attr_value_indices_to_remove.append(view_id_index)
-						if 'GraphID' in node_header:
-							GraphID_index = node_header.index('GraphID')
-							node_attr_value_indices_to_remove.append(GraphID_index)
-						if 'wgs84_node_x' in node_header:
-							wgs84_node_x_index = node_header.index('wgs84_node_x')
-							node_attr_value_indices_to_remove.append(wgs84_node_x_index)
-						if 'wgs84_node_y' in node_header:
-							wgs84_node_y_index = node_header.index('wgs84_node_y')
-							node_attr_value_indices_to_remove.append(wgs84_node_y_index)
-						if 'google_node_x' in node_header:
-							google_node_x_index = node_header.index('google_node_x')
-							node_attr_value_indices_to_remove.append(google_node_x_index)
-						if 'google_node_y' in node_header:
-							google_node_y_index = node_header.index('google_node_y')
-							node_attr_value_indices_to_remove.append(google_node_y_index)
-						if node_file_raw_geometry_key in node_header:
-							node_raw_geometry_index = node_header.index(node_file_raw_geometry_key)
-							node_attr_value_indices_to_remove.append(node_raw_geometry_index)
-
-						#sort, then reverse indices to ensure last index is removed first
-						node_attr_value_indices_to_remove.sort()
-						node_attr_value_indices_to_remove.reverse()
-						for index in node_attr_value_indices_to_remove:
-							node_header.pop(index)
-
-						node_csv_first_line = False
-					else:
-						#check node file for geometry [node_file_geometry_key]
-						if node_geometry_text_index > -1:
-
-							#create a node geometry
-							node_geom = ogr.CreateGeometryFromWkt(node_line[node_geometry_text_index])
-
-							#node tuple containing node coordinates
-							node_tuple = '(%s, %s)' % (node_geom.GetX(), node_geom.GetY())
-
-							#this dictionary should ignore any attributes called:
-							#NodeID
-							#view_id
-							#GraphID
-							node_attr_values = list(node_line)
-
-							for index in node_attr_value_indices_to_remove:
-								node_attr_values.pop(index)
-
-							#create a node attribute dictionary
-							node_attrs = dict(list(zip(node_header, node_attr_values)))
-
-							#export this geometry to wkt, json, wkb
-							#attach these as attributes to node
-							graph.add_node(node_tuple, node_attrs)
-
-						else:
-							raise Error('There was no WKT geometry representation found in the node file %s, with WKT field name %s' % (node_file_path, node_file_geometry_text_key))
-
-				#close the csv file
-				node_csv_file.close()
-
-				#edge csv file open
-				edge_csv_file = open(edge_file_path, 'r')
-				edge_csv_reader = csv.reader(edge_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
-
-				#set default index for each column in csv file
-				GraphID_index = -1
-				Edge_GeomID_index = -1
-				EdgeID_index = -1
-				Node_F_ID_index = -1
-				Node_T_ID_index = -1
-				view_id_index = -1
-				edge_geometry_text_index = -1
-				edge_geometry_raw_geometry_index = -1
-
-				google_startpoint_x_index = -1
-				google_startpoint_y_index =	-1
-				google_endpoint_x_index = -1
-				google_endpoint_y_index = -1
-
-				wgs84_startpoint_x_index = -1
-				wgs84_startpoint_y_index = -1
-				wgs84_endpoint_x_index = -1
-				wgs84_endpoint_y_index = -1
-
-				edge_csv_first_line = True
-				edge_header = []
-
-				#will store indices to remove from node attribute values
-				edge_attr_value_indices_to_remove = []
-
-				for edge_line in edge_csv_reader:
-					if edge_csv_first_line == True:
-						#get the header from the edge file
-						edge_header = list(edge_line)
-
-						#check for WKT
-						if edge_file_geometry_text_key in edge_header:
-							edge_geometry_text_index = edge_header.index(edge_file_geometry_text_key)
-
-						if 'GraphID' in edge_header:
-							GraphID_index = edge_header.index('GraphID')
-							edge_attr_value_indices_to_remove.append(GraphID_index)
-						if 'Edge_GeomID' in edge_header:
-							Edge_GeomID_index = edge_header.index('Edge_GeomID')
-							edge_attr_value_indices_to_remove.append(Edge_GeomID_index)
-						if 'EdgeID' in edge_header:
-							EdgeID_index = edge_header.index('EdgeID')
-							edge_attr_value_indices_to_remove.append(EdgeID_index)
-						if 'Node_F_ID' in edge_header:
-							Node_F_ID_index = edge_header.index('Node_F_ID')
-							edge_attr_value_indices_to_remove.append(Node_F_ID_index)
-						if 'Node_T_ID' in edge_header:
-							Node_T_ID_index = edge_header.index('Node_T_ID')
-							edge_attr_value_indices_to_remove.append(Node_T_ID_index)
-						if 'view_id' in edge_header:
-							view_id_index = edge_header.index('view_id')
-							edge_attr_value_indices_to_remove.append(view_id_index)
-						if 'google_startpoint_x' in edge_header:
-							google_startpoint_x_index = edge_header.index('google_startpoint_x')
-							edge_attr_value_indices_to_remove.append(google_startpoint_x_index)
-						if 'google_startpoint_y' in edge_header:
-							google_startpoint_y_index = edge_header.index('google_startpoint_y')
-							edge_attr_value_indices_to_remove.append(google_startpoint_y_index)
-						if 'google_endpoint_x' in edge_header:
-							google_endpoint_x_index = edge_header.index('google_endpoint_x')
-							edge_attr_value_indices_to_remove.append(google_endpoint_x_index)
-						if 'google_endpoint_y' in edge_header:
-							google_endpoint_y_index = edge_header.index('google_endpoint_y')
-							edge_attr_value_indices_to_remove.append(google_endpoint_y_index)
-						if 'wgs84_startpoint_x' in edge_header:
-							wgs84_startpoint_x_index = edge_header.index('wgs84_startpoint_x')
-							edge_attr_value_indices_to_remove.append(wgs84_startpoint_x_index)
-						if 'wgs84_startpoint_y' in edge_header:
-							wgs84_startpoint_y_index = edge_header.index('wgs84_startpoint_y')
-							edge_attr_value_indices_to_remove.append(wgs84_startpoint_y_index)
-						if 'wgs84_endpoint_x' in edge_header:
-							wgs84_endpoint_x_index = edge_header.index('wgs84_endpoint_x')
-							edge_attr_value_indices_to_remove.append(wgs84_endpoint_x_index)
-						if 'wgs84_endpoint_y' in edge_header:
-							wgs84_endpoint_y_index = edge_header.index('wgs84_endpoint_y')
-							edge_attr_value_indices_to_remove.append(wgs84_endpoint_y_index)
-						if edge_file_raw_geometry_key in edge_header:
-							edge_geometry_raw_geometry_index = edge_header.index(edge_file_raw_geometry_key)
-							edge_attr_value_indices_to_remove.append(edge_geometry_raw_geometry_index)
-
-						#sort, then reverse indices to ensure last index is removed first
-						edge_attr_value_indices_to_remove.sort()
-						edge_attr_value_indices_to_remove.reverse()
-
-						#remove all column headings (attributes) that are not to be transferred to db
-						for index in edge_attr_value_indices_to_remove:
-							edge_header.pop(index)
-
-						edge_csv_first_line = False
-
-					else:
-
-						#check edge file for geometry ['geometry_text']
-						if edge_geometry_text_index > -1:
-
-							#create edge geometry
-							edge_geom = ogr.CreateGeometryFromWkt(edge_line[edge_geometry_text_index])
-
-							#point count of edge
-							point_count = edge_geom.GetPointCount()
-
-							#grab start point of edge
-							start_point_edge_geom = edge_geom.GetPoint_2D(0)
-
-							#grab end point of edge
-							end_point_edge_geom = edge_geom.GetPoint_2D(point_count-1)
-
-							#create tuples of start and end point coordinates
-							start_point_edge_tuple = '(%s, %s)' % (start_point_edge_geom[0], start_point_edge_geom[1])
-							end_point_edge_tuple = '(%s, %s)' % (end_point_edge_geom[0], end_point_edge_geom[1])
-
-							#grab the csv line as a list
-							edge_attr_values = list(edge_line)
-
-							#remove all values from current line that are not to be transferred to db
-							for index in edge_attr_value_indices_to_remove:
-								edge_attr_values.pop(index)
-
-							#create a edge attribute dictionary
-							edge_attrs = dict(list(zip(edge_header, edge_attr_values)))
-
-							graph.add_edge(start_point_edge_tuple, end_point_edge_tuple, edge_attrs)
-						else:
-							raise Error('There was no WKT geometry representation found in the edge file %s, with WKT field name %s' % (edge_file_path, edge_file_geometry_text_key))
-
-				#close edge file
-				edge_csv_file.close()
+				#NodeID, view_id, GraphID, the wgs84 / google coordinates and the raw geometry are not node attributes
+				node_geometries, node_records = _read_csv(node_file_path, node_file_geometry_text_key, _GEPHI_NODE_SKIP_COLUMNS + (node_file_raw_geometry_key,))
+				if node_records and node_geometries is None:
+					raise Error('There was no WKT geometry representation found in the node file %s, with WKT field name %s' % (node_file_path, node_file_geometry_text_key))
+
+				for node_geometry_text, node_attrs in zip(node_geometries or [], node_records):
+					#node tuple containing node coordinates
+					nodes.append((_wkt_point_xy(node_geometry_text), node_attrs))
+				graph.add_nodes_from(nodes)
+
+				#EdgeID, Node_F_ID, Node_T_ID etc., the wgs84 / google coordinates and the raw geometry are not edge attributes
+				edge_geometries, edge_records = _read_csv(edge_file_path, edge_file_geometry_text_key, _GEPHI_EDGE_SKIP_COLUMNS + (edge_file_raw_geometry_key,))
+				if edge_records and edge_geometries is None:
+					raise Error('There was no WKT geometry representation found in the edge file %s, with WKT field name %s' % (edge_file_path, edge_file_geometry_text_key))
+
+				for edge_geometry_text, edge_attrs in zip(edge_geometries or [], edge_records):
+					#grab start and end points of edge
+					start_point_edge_geom, end_point_edge_geom = _wkt_line_ends(edge_geometry_text)
+
+					#create tuples of start and end point coordinates
+					start_point_edge_tuple = (start_point_edge_geom[0], start_point_edge_geom[1])
+					end_point_edge_tuple = (end_point_edge_geom[0], end_point_edge_geom[1])
+
+					edges.append((start_point_edge_tuple, end_point_edge_tuple, edge_attrs))
+				graph.add_edges_from(edges)
 				return graph
 			else:
 
 				#edge csv file open
-				edge_csv_file = open(edge_file_path, 'r')
-				edge_csv_reader = csv.DictReader(edge_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
-
-				use_F_ID = True
-				use_T_ID = True
+				with open(edge_file_path, 'r', newline='', buffering=_CSV_BUFFER_SIZE, encoding='utf-8') as edge_csv_file:
+					edge_csv_reader = csv.DictReader(edge_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
 
-				edge_csv_first_line = True
-				for edge_data in edge_csv_reader:
-					if edge_csv_first_line == True:
+					#the required columns are checked, and the start and end columns chosen, from the first row
+					first_edge_data = next(edge_csv_reader, None)
+					if first_edge_data is not None:
 
-						if 'Node_F_ID' not in edge_data and 'Source' not in edge_data:
+						if 'Node_F_ID' not in first_edge_data and 'Source' not in first_edge_data:
 							raise Error('The specified edge file (%s) does not contain either a value for Node_F_ID or Source. Either or both of these values must be defined when importing from a Gephi edge list.' % (edge_file_path))
-						if 'Node_T_ID' not in edge_data and 'Target' not in edge_data:
+						if 'Node_T_ID' not in first_edge_data and 'Target' not in first_edge_data:
 							raise Error('The specified edge file (%s) does not contain either a value for Node_T_ID or Target. Either or both of these values must be defined when importing from a Gephi edge list.' % (edge_file_path))
-						if 'Edge_GeomID' not in edge_data:
+						if 'Edge_GeomID' not in first_edge_data:
 							raise Error('The specified edge file (%s) does not contain a value for Edge_GeomID' % (edge_file_path))
-						if 'EdgeID' not in edge_data:
+						if 'EdgeID' not in first_edge_data:
 							raise Error('The specified edge file (%s) does not contain a value for EdgeID' % (edge_file_path))
 
 						#determine start of edge
-						if 'Node_F_ID' in edge_data:
-							from_ = edge_data['Node_F_ID']
-							use_F_ID = True
-						elif 'Source' in edge_data:
-							from_ = edge_data['Source']
-							use_F_ID = False
+						if 'Node_F_ID' in first_edge_data:
+							from_key = 'Node_F_ID'
+						else:
+							from_key = 'Source'
 
 						#determine end of edge
-						if 'Node_T_ID' in edge_data:
-							to_ = edge_data['Node_T_ID']
-							use_T_ID = True
-						elif 'Target' in edge_data:
-							to_ = edge_data['Target']
-							use_T_ID = False
-
-						#remove unnecessary attributes
-						edge_attrs = edge_data
-						if 'Node_F_ID' in edge_attrs:
-							del edge_attrs['Node_F_ID']
-						if 'Node_T_ID' in edge_attrs:
-							del edge_attrs['Node_T_ID']
-						if 'Source' in edge_attrs:
-							del edge_attrs['Source']
-						if 'Target' in edge_attrs:
-							del edge_attrs['Target']
-
-						graph.add_edge(from_, to_, edge_attrs)
-
-						edge_csv_first_line = False
-					else:
-						edge_attrs = edge_data
-
-						if use_F_ID == True:
-							from_ = edge_attrs['Node_F_ID']
-						else:
-							from_ = edge_attrs['Source']
-						if use_T_ID == True:
-							to_ = edge_attrs['Node_T_ID']
+						if 'Node_T_ID' in first_edge_data:
+							to_key = 'Node_T_ID'
 						else:
-							to_ = edge_attrs['Target']
-
-						#remove unnecessary attributes
-						edge_attrs = edge_data
-						if 'Node_F_ID' in edge_attrs:
-							del edge_attrs['Node_F_ID']
-						if 'Node_T_ID' in edge_attrs:
-							del edge_attrs['Node_T_ID']
-						if 'Source' in edge_attrs:
-							del edge_attrs['Source']
-						if 'Target' in edge_attrs:
-							del edge_attrs['Target']
-
-						graph.add_edge(from_, to_, edge_attrs)
-
-				edge_csv_file.close()
+							to_key = 'Target'
+
+						for edge_data in itertools.chain([first_edge_data], edge_csv_reader):
+							#remove unnecessary attributes
+							edge_attrs = {key: value for key, value in edge_data.items() if key not in _GEPHI_ENDPOINT_COLUMNS}
+
+							edges.append((edge_data[from_key], edge_data[to_key], edge_attrs))
+
+				graph.add_edges_from(edges)
 				return graph
 
 		else:
@@ -1380,6 +1491,8 @@ class publish_graph:
 		self.geoserver_rest_url = geoserver_rest_url
 		self.geoserver_rest_username = geoserver_rest_username
 		self.geoserver_rest_password = geoserver_rest_password
+		#parameters of the connection string, see get_db_parameter_from_connection
+		self._connection_params = None
 
 		#creates a catalog to the geoserver REST url supplied, using supplied credentials
 		self.geoserver_catalog = Catalog(geoserver_rest_url, geoserver_rest_username, geoserver_rest_password)
@@ -1399,31 +1512,23 @@ class publish_graph:
 		if ((param != 'host') and (param != 'dbname') and (param != 'user') and (param != 'password') and (param != 'port')):
 			raise Error('Cannot retrieve the given parameter from the current OGR connection. Please ensure the parameter is one of host, dbname, user, password or port')
 		else:
-			connection_string = self.conn.name
+			#the connection string is parsed once, on first use
+			if self._connection_params is None:
+				self._connection_params = dict((key, quoted or unquoted) for key, quoted, unquoted in _CONNECTION_PARAMETER.findall(self.conn.name))
 
-			#find the connection parameter from the connection string
-			connection_param_start_pos = connection_string.find("%s='", (param))
+			if param in self._connection_params:
+				return self._connection_params[param]
 
 			#means given parameter does not exist
 			#return a default otherwise
-			if connection_param_start_pos == -1:
-				if param == 'port':
-					return 5432
-				elif param == 'user':
-					return 'postgres'
-				elif param == 'host':
-					return 'localhost'
-				else:
-					parameter_error_msg = 'Given parameter cannot be found in current OGR connection, and defaults for it cannot be returned. Given parameter value (%s)', param
-					raise Error(parameter_error_msg)
+			if param == 'port':
+				return 5432
+			elif param == 'user':
+				return 'postgres'
+			elif param == 'host':
+				return 'localhost'
 			else:
-				connection_param_substring = connection_string[connection_param_start_pos:]
-				connection_param_first_single_quote_pos = connection_param_substring.find("'")
-				connection_param_first_substring = connection_param_substring[connection_param_first_single_quote_pos+1:]
-				connection_param_second_single_quote_pos = connection_param_first_substring.find("'")
-				connection_param = connection_param_first_substring[:connection_param_second_single_quote_pos]
-
-				return connection_param
+				raise Error('Given parameter cannot be found in current OGR connection, and defaults for it cannot be returned. Given parameter value (%s)' % (param))
 
 	def create_network_schema_datastore(self, datastore_name, workspace_name=None):
 		'''
@@ -1502,52 +1607,15 @@ class export_graph:
 
 		'''
 
-		#import json_graph
-		from networkx.readwrite import json_graph
-
 		#check the output path exists
 		if os.path.isdir(path):
 
 			#set the full output path to save the JSON file to
 			full_path = '%s/%s.json' % (path, output_filename)
 
-			#copy the graph
-			graph_copy = graph.copy()
-
-			for edge in graph_copy.edges(data=True):
-				edge_attrs = edge[2]
-
-				#remove the wkb attr from the edge attributes
-				if 'Wkb' in edge_attrs:
-					del edge[2]['Wkb']
-
-				#remove the json attr from the edge attributes
-				if 'Json' in edge_attrs:
-					del edge[2]['Json']
-
-			for node in graph_copy.nodes(data=True):
-				node_attrs = node[1]
-
-				#remove the wkb attrs from the node attributes
-				if 'Wkb' in node_attrs:
-					del node_attrs['Wkb']
-
-				#remove the json attr from the node attributes
-				if 'Json' in node_attrs:
-					del node_attrs['Json']
-
-			#get node link data (ready for json serializing)
-			data = json_graph.node_link_data(graph_copy)
-
-			#serialize the graph data
-			json_data = json.dumps(data)
-
-			#open the output file
-			json_file = open(full_path, 'w')
-			#write the json data to a file
-			json_file.write(json_data)
-			#close the output file
-			json_file.close()
+			#write the graph as node link data, without the wkb and json attrs of nodes and edges
+			with open(full_path, 'wb') as json_file:
+				_write_node_link_json(graph, json_file, _JSON_EXPORT_SKIP_KEYS)
 
 			#return the path to the json file
 			return full_path
@@ -1576,40 +1644,11 @@ class export_graph:
 			else:
 				name = 'A graph'
 
-			#create a networkx copy of the graph to export
-			graph_copy = graph.copy()
+			#create a networkx copy of the graph to export, without the wkb attrs of nodes and edges
+			#converting None to "None" so they can be handled by NetworkX gexf writer (NoneType unsupported)
+			graph_copy = _export_copy(graph, _EXPORT_SKIP_KEYS, none_to_string=True)
 			graph_copy.name=name
 
-			#currently converting None type to "None"
-			for edge in graph_copy.edges(data=True):
-				edge_attrs = edge[2]
-
-				#remove the wkb attr from the edge attributes
-				if 'Wkb' in edge_attrs:
-					del edge[2]['Wkb']
-
-				#convert edge values from None to "None" so they can be handled by NetworkX gexf writer (NoneType unsupported)
-				for edge_key in list(edge_attrs.keys()):
-					edge_value = edge_attrs[edge_key]
-					if edge_value == None:
-						edge_value = 'None'
-						edge_attrs[edge_key] = edge_value
-
-			#convert node values from None to "None" so they can be handled by NetworkX gexf writer (NoneType unsupported)
-			for node in graph_copy.nodes(data=True):
-
-				node_attrs = node[1]
-
-				#remove the wkb attrs from the edge attributes
-				if 'Wkb' in node_attrs:
-					del node_attrs['Wkb']
-
-				for node_key in list(node_attrs.keys()):
-					node_value = node_attrs[node_key]
-					if node_value == None:
-						node_value = 'None'
-						node_attrs[node_key] = node_value
-
 			#write the gexf file
 			nx.write_gexf(graph_copy, full_path, encoding=encoding, prettyprint=prettyprint)
 			return full_path
@@ -1646,72 +1685,16 @@ class export_graph:
 
 			if spatial:
 
-				#checking input graph type (regular graph)
-				if isinstance(graph, nx.classes.graph.Graph):
-					graph_copy = nx.Graph(name=name)
-				#checking input graph type (directed graph)
-				elif isinstance(graph, nx.classes.digraph.DiGraph):
-					graph_copy = nx.DiGraph(name=name)
-				#checking input graph type (multi graph)
-				elif isinstance(graph, nx.classes.multigraph.MultiGraph):
-					graph_copy = nx.MultiGraph(name=name)
-				#checking input graph type (multi directed graph)
-				elif isinstance(graph, nx.classes.multidigraph.MultiDiGraph):
-					graph_copy = nx.MultiDiGraph(name=name)
-				else:
+				#checking input graph type
+				if not isinstance(graph, _GRAPH_CLASSES):
 					raise Error('There was an error whilst trying to recognise the type of graph to be created. The graph to be exported must be one of the following types: undirected graph (nx.Graph), directed graph (nx.DiGraph), undirected multigraph (nx.MultiGraph), directed multigraph (nx.MultiGraph). The type found was %s' % (str(type(graph))))
 
-				#copy the nodes to the graph to be output as Pajek i.e. remove all node attributes
-				#keep x and y to ensure the network
-				for node in graph.nodes(data=True):
-					if node_attribute_label is not None or node_attribute_label != '':
-						key = '%s' % str(node_attribute_label)
-						raw_value = str(node[1][node_attribute_label]).rstrip().lstrip()
-						#add the node to the graph, with associated attribute
-						graph_copy.add_node(node[0], {'x': float(node[0][0]), 'y':float(node[0][1]), key:raw_value})
-					else:
-						#add the node to the graph
-						graph_copy.add_node(node[0], {'x': float(node[0][0]), 'y':float(node[0][1])})
-
-				#copy the edges to the graph to be output as Pajek i.e. remove all edge attributes
-				for edge in graph.edges(data=True):
-					#user has specified an attribute name to use as values for edge weights
-					if type(edge_attribute_weight) == str:
-						#add the edge to the graph
-						graph_copy.add_edge(edge[0], edge[1], {'weight': edge[2][edge_attribute_weight]})
-					#user has supplied a constant value
-					else:
-						#add the edge to the graph
-						graph_copy.add_edge(edge[0], edge[1], {'weight': edge_attribute_weight})
-
-				#write the copy to the output path
-				nx.write_pajek(graph_copy, full_path, encoding=encoding)
+				#write a view of the graph that drops all attributes but x, y, the node label and the edge weight
+				nx.write_pajek(_PajekView(graph, name, node_attribute_label, edge_attribute_weight), full_path, encoding=encoding)
 				return full_path
 			else:
-				#create copy of original graph
-				graph_copy = graph.copy()
-
-				#remove the empty node geometry attributes (Wkb, Wkt, Json)
-				for node in graph_copy.nodes(data=True):
-					if len(node) > 1:
-						node_attrs = node[1]
-						if 'Wkb' in node_attrs:
-							del node_attrs['Wkb']
-						'''if node_attrs.has_key('Wkt'):
-							del node_attrs['Wkt']
-						if node_attrs.has_key('Json'):
-							del node_attrs['Json']'''
-
-				#remove the empty edge geometry attributes (Wkb, Wkt, Json)
-				for edge in graph_copy.edges(data=True):
-					if len(edge) > 2:
-						edge_attrs = edge[2]
-						if 'Wkb' in edge_attrs:
-							del edge_attrs['Wkb']
-						'''if edge_attrs.has_key('Wkt'):
-							del edge_attrs['Wkt']
-						if edge_attrs.has_key('Json'):
-							del edge_attrs['Json']'''
+				#create copy of original graph, without the node and edge wkb attributes
+				graph_copy = _export_copy(graph, _EXPORT_SKIP_KEYS)
 
 				#write the copy to the output path
 				nx.write_pajek(graph_copy, full_path, encoding=encoding)
@@ -1737,15 +1720,8 @@ class export_graph:
 			#set the full output path to save the YAML file to
 			full_path = '%s/%s.yaml' % (path, output_filename)
 
-			#create a networkx copy of the graph to export
-			graph_copy = graph.copy()
-
-			#remove wkb attribute from edge
-			for edge in graph_copy.edges(data=True):
-				if len(edge) > 1:
-					edge_attrs = edge[2]
-					if 'Wkb' in edge_attrs:
-						del edge[2]['Wkb']
+			#create a networkx copy of the graph to export, without the node and edge wkb attributes
+			graph_copy = _export_copy(graph, _EXPORT_SKIP_KEYS)
 
 			#write out the graph to YAML format
 			nx.write_yaml(graph_copy, full_path, encoding)
@@ -1774,43 +1750,12 @@ class export_graph:
 			#set the full output path to save the GraphML file to
 			full_path = '%s/%s.graphml' % (path, output_filename)
 
-			#create a networkx copy of the graph to export
-			graph_copy = graph.copy()
-
-			#remove the Wkb element from the edge attributes
-			for edge in graph_copy.edges(data=True):
-				if len(edge) > 2:
-					edge_attrs = edge[2]
-					if 'Wkb' in edge_attrs:
-						del edge[2]['Wkb']
-
-			#remove the Wkb element from the node attributes
-			for node in graph_copy.nodes(data=True):
-				if len(node) > 0:
-					node_attrs = node[1]
-					if 'Wkb' in node_attrs:
-						del node[1]['Wkb']
-
-			#currently converting None type to "None"
-			for edge in graph_copy.edges(data=True):
-				edge_attrs = edge[2]
-				for edge_key in list(edge_attrs.keys()):
-					edge_value = edge_attrs[edge_key]
-					if edge_value == None:
-						edge_value = 'None'
-						edge_attrs[edge_key] = edge_value
-
+			#create a networkx copy of the graph to export, without the node and edge wkb attributes
 			#currently converting None type to "None"
-			for node in graph_copy.nodes(data=True):
-				node_attrs = node[1]
-				for node_key in list(node_attrs.keys()):
-					node_value = node_attrs[node_key]
-					if node_value == None:
-						node_value = 'None'
-						node_attrs[node_key] = node_value
+			graph_copy = _export_copy(graph, _EXPORT_SKIP_KEYS, none_to_string=True)
 
 			#write out the graph to GraphML format
-			nx.write_graphml(graph_copy, full_path, encoding=encoding, prettyprint=prettyprint)
+			_write_graphml(graph_copy, full_path, encoding=encoding, prettyprint=prettyprint)
 			return full_path
 		else:
 			raise Error('The specified path %s does not exist' % (path))
@@ -1836,16 +1781,9 @@ class export_graph:
 			#set the full output path to write the GML file to
 			full_path = '%s/%s.gml' % (path, output_filename)
 
-			#create a networkx copy of the graph to export
-			graph_copy = graph.copy()
-
-			#currently deleting the Wkb element from the edge attributes
-			for edge in graph_copy.edges(data=True):
-				if len(edge) > 1:
-					edge_attrs = edge[2]
-					#currently removes the wkb element to allow writing to pajek
-					if 'Wkb' in edge_attrs:
-						del edge[2]['Wkb']
+			#create a networkx copy of the graph to export, without the node and edge wkb attributes
+			#(node attributes of the copy are changed below, not those of graph)
+			graph_copy = _export_copy(graph, _EXPORT_SKIP_KEYS)
 
 			#need to ensure that the nodes have coordinates added to them on the way out e.g. as JSON and WKT
 			for node in graph_copy.nodes(data=True):
@@ -1927,10 +1865,14 @@ class export_graph:
 
 		if spatial:
 			#define the sql to execute for generating a Gephi-compatible csv dump of the node view
-			node_sql = ("COPY (SELECT node_table.*, ST_AsText(node_table.%s) as geometry_text, ST_SRID(node_table.%s) as srid, ST_X(ST_AsText(ST_Transform(node_table.%s, 900913))) as google_node_x, ST_Y(ST_AsText(ST_Transform(node_table.%s, 900913))) as google_node_y, ST_X(ST_AsText(ST_Transform(node_table.%s, 4326))) as wgs84_node_x, ST_Y(ST_AsText(ST_Transform(node_table.%s, 4326))) as wgs84_node_y FROM \"%s\" AS node_table) TO '%s' DELIMITER AS ',' CSV HEADER;" % (node_geometry_column_name, node_geometry_column_name, node_geometry_column_name, node_geometry_column_name, node_geometry_column_name, node_geometry_column_name, node_viewname, node_file_name))
+			#each node is transformed once per projection, in the inner query (OFFSET 0 stops the planner
+			#from pulling it up and repeating the transforms), and the view row is carried through whole
+			#so the output columns stay node_table.* + the extra columns
+			node_sql = ("COPY (SELECT (projected.node_table).*, ST_AsText((projected.node_table).%(geom)s) as geometry_text, ST_SRID((projected.node_table).%(geom)s) as srid, ST_X(projected.google_geom) as google_node_x, ST_Y(projected.google_geom) as google_node_y, ST_X(projected.wgs84_geom) as wgs84_node_x, ST_Y(projected.wgs84_geom) as wgs84_node_y FROM (SELECT node_table, ST_Transform(node_table.%(geom)s, 900913) AS google_geom, ST_Transform(node_table.%(geom)s, 4326) AS wgs84_geom FROM \"%(view)s\" AS node_table OFFSET 0) AS projected) TO '%(file)s' DELIMITER AS ',' CSV HEADER;" % {'geom': node_geometry_column_name, 'view': node_viewname, 'file': node_file_name})
 
 			#define the sql to execute for generating a Gephi-compatible csv dump of the edge view
-			edge_sql = ("COPY (SELECT edge_table.*, ST_AsText(edge_table.%s) as geometry_text, ST_SRID(edge_table.%s) as srid, \"Node_F_ID\" as \"Source\", \"Node_T_ID\" as \"Target\", '%s' as \"Type\", ST_X(ST_Transform(ST_StartPoint(edge_table.%s), 900913)) as google_startpoint_x, ST_Y(ST_Transform(ST_StartPoint(edge_table.%s), 900913)) as google_startpoint_y, ST_X(ST_Transform(ST_EndPoint(edge_table.%s), 900913)) as google_endpoint_x, ST_Y(ST_Transform(ST_EndPoint(edge_table.%s), 900913)) as google_endpoint_y, ST_X(ST_Transform(ST_StartPoint(edge_table.%s), 4326)) as wgs84_startpoint_x, ST_Y(ST_Transform(ST_StartPoint(edge_table.%s), 4326)) as wgs84_startpoint_y, ST_X(ST_Transform(ST_EndPoint(edge_table.%s), 4326)) as wgs84_endpoint_x, ST_Y(ST_Transform(ST_EndPoint(edge_table.%s), 4326)) as wgs84_endpoint_y FROM \"%s\" AS edge_table) TO '%s' DELIMITER AS ',' CSV HEADER" % (edge_geometry_column_name, edge_geometry_column_name, gephi_directed_value, edge_geometry_column_name, edge_geometry_column_name, edge_geometry_column_name, edge_geometry_column_name, edge_geometry_column_name, edge_geometry_column_name, edge_geometry_column_name, edge_geometry_column_name, edge_viewname, edge_file_name))
+			#the start and end points of each edge are transformed together, once per projection, as a two point line
+			edge_sql = ("COPY (SELECT (projected.edge_table).*, ST_AsText((projected.edge_table).%(geom)s) as geometry_text, ST_SRID((projected.edge_table).%(geom)s) as srid, (projected.edge_table).\"Node_F_ID\" as \"Source\", (projected.edge_table).\"Node_T_ID\" as \"Target\", '%(type)s' as \"Type\", ST_X(ST_StartPoint(projected.google_ends)) as google_startpoint_x, ST_Y(ST_StartPoint(projected.google_ends)) as google_startpoint_y, ST_X(ST_EndPoint(projected.google_ends)) as google_endpoint_x, ST_Y(ST_EndPoint(projected.google_ends)) as google_endpoint_y, ST_X(ST_StartPoint(projected.wgs84_ends)) as wgs84_startpoint_x, ST_Y(ST_StartPoint(projected.wgs84_ends)) as wgs84_startpoint_y, ST_X(ST_EndPoint(projected.wgs84_ends)) as wgs84_endpoint_x, ST_Y(ST_EndPoint(projected.wgs84_ends)) as wgs84_endpoint_y FROM (SELECT edge_table, ST_Transform(ends, 900913) AS google_ends, ST_Transform(ends, 4326) AS wgs84_ends FROM (SELECT edge_table, ST_MakeLine(ST_StartPoint(edge_table.%(geom)s), ST_EndPoint(edge_table.%(geom)s)) AS ends FROM \"%(view)s\" AS edge_table OFFSET 0) AS edge_ends OFFSET 0) AS projected) TO '%(file)s' DELIMITER AS ',' CSV HEADER" % {'geom': edge_geometry_column_name, 'type': gephi_directed_value, 'view': edge_viewname, 'file': edge_file_name})
 
 			#execute the node view to csv query
 			node_result = self.conn.ExecuteSQL(node_sql)
@@ -1972,17 +1914,19 @@ class read:
 
 		if self.conn == None:
 			raise Error('No connection to database.')
+		#geometry attributes to store, set by pgnet
+		self.exporters = [_GEOM_EXPORTERS[fmt] for fmt in ('wkb', 'wkt', 'json')]
 
 	def getfieldinfo(self, lyr, feature, flds):
 		'''Get information about fields from a table (as OGR feature).
 
 		lyr - OGR Layer
 		feature - OGR feature to query
-		flds - dict - dictionary of fields
+		flds - list - field indices (or names), indices avoid a name lookup per field per feature
 
 		'''
 		f = feature
-		return [f.GetField(f.GetFieldIndex(x)) for x in flds]
+		return [f.GetField(x) for x in flds]
 
 	def pgnet_edges(self, graph):
 		'''Reads edges from edge and edge_geometry tables and add to graph.
@@ -2004,25 +1948,21 @@ class read:
 		# Get current feature
 		feat = lyr.GetNextFeature()
 
-		# Get fields
-		flds = [x.GetName() for x in lyr.schema]
+		# Get fields, and their indices once for every feature, leaving out
+		# view_id, edgeid and geomid from previous views
+		flds = [x.GetName() for x in lyr.schema if x.GetName() not in ('view_id', 'edgeid', 'geomid')]
+		defn = lyr.GetLayerDefn()
+		fld_idxs = [defn.GetFieldIndex(x) for x in flds]
+
+		#unique key expected or multigraphs (always labelled uuid)
+		multigraph = graph.is_multigraph()
+		#edges are collected, then added to the graph in one call
+		edges = []
 
 		while feat is not None:
 			# Read edge attrs.
-			flddata = self.getfieldinfo(lyr, feat, flds)
-			attributes = dict(list(zip(flds, flddata)))
-
-			#delete view_id from previous view
-			if 'view_id' in attributes:
-				del attributes['view_id']
-
-			#delete edgeid from previous view
-			if 'edgeid' in attributes:
-				del attributes['edgeid']
-
-			#delete geomid from previous view
-			if 'geomid' in attributes:
-				del attributes['geomid']
+			flddata = self.getfieldinfo(lyr, feat, fld_idxs)
+			attributes = dict(zip(flds, flddata))
 
 			#attributes['network'] = network_name
 			geom = feat.GetGeometryRef()
@@ -2030,38 +1970,20 @@ class read:
 			#can be a case where there is a feature but there is no geometry for that feature
 			if geom is not None:
 
-				if ((ogr.Geometry.GetGeometryName(geom) == 'MULTILINESTRING') or (ogr.Geometry.GetGeometryName(geom) == 'LINESTRING') or ((ogr.Geometry.GetGeometryName(geom) == 'GEOMETRYCOLLECTION') and (str(geom) == 'GEOMETRYCOLLECTION EMPTY'))):
-					attributes["Wkb"] = ogr.Geometry.ExportToWkb(geom)
-					attributes["Wkt"] = ogr.Geometry.ExportToWkt(geom)
-					attributes["Json"] = ogr.Geometry.ExportToJson(geom)
-
-					geomid = attributes['Edge_GeomID']
-					sql = ('SELECT * FROM "%s" WHERE "GeomID" = %s' %(self.prefix+'_View_Edges_Edge_Geometry',geomid))
-					atts = {}
+				geom_type = ogr.GT_Flatten(geom.GetGeometryType())
+				if ((geom_type == ogr.wkbMultiLineString) or (geom_type == ogr.wkbLineString) or ((geom_type == ogr.wkbGeometryCollection) and geom.IsEmpty())):
+					for key, export in self.exporters:
+						attributes[key] = export(geom)
 
-					for row in self.conn.ExecuteSQL(sql):
-
-						for key in row.keys():
-
-							atts[key]=row[key]
-
-					#res = self.conn.ExecuteSQL('SELECT * FROM #"iuk_ngnet_eg_View_Edges_Edge_Geometry" WHERE "GeomID" = %s' %i)
-					#print('reults from view table')
-					#for row in res:
-					#	for key in row.keys():
-					#		print key,':',row[key]
-					#	exit()
-
-					if (isinstance(graph, nx.classes.multigraph.MultiGraph) or isinstance(graph, nx.classes.multidigraph.MultiDiGraph)):
-						#unique key expected or multigraphs (always labelled uuid)
-						uuid = attributes['uuid']
-						graph.add_edge(attributes['Node_F_ID'], attributes['Node_T_ID'], uuid, attributes)
+					if multigraph:
+						edges.append((attributes['Node_F_ID'], attributes['Node_T_ID'], attributes['uuid'], attributes))
 					else:
-						graph.add_edge(attributes['Node_F_ID'], attributes['Node_T_ID'], attributes)
-						graph.add_edge(atts['Node_F_ID'],atts['Node_T_ID'],atts)
+						edges.append((attributes['Node_F_ID'], attributes['Node_T_ID'], attributes))
 
 			feat = lyr.GetNextFeature()
 
+		graph.add_edges_from(edges)
+
 	def pgnet_nodes(self, graph):
 		'''Reads nodes from node table and add to graph.
 
@@ -2077,28 +1999,23 @@ class read:
 		#reset to read from start of node view
 		lyr.ResetReading()
 
-		# Get fields
-		flds = [x.GetName() for x in lyr.schema]
+		# Get fields, and their indices once for every feature, leaving out
+		# view_id and nodeid from previous views
+		flds = [x.GetName() for x in lyr.schema if x.GetName() not in ('view_id', 'nodeid')]
+		defn = lyr.GetLayerDefn()
+		fld_idxs = [defn.GetFieldIndex(x) for x in flds]
 		# Get current feature
 		feat = lyr.GetNextFeature()
 
 		# Loop features
 		while feat is not None:
 			# Read node attrs.
-			flddata = self.getfieldinfo(lyr, feat, flds)
-			attributes = dict(list(zip(flds, flddata)))
-
-			#delete view_id from previous view
-			if 'view_id' in attributes:
-				del attributes['view_id']
-
-			if 'nodeid' in attributes:
-				del attributes['nodeid']
+			flddata = self.getfieldinfo(lyr, feat, fld_idxs)
+			attributes = dict(zip(flds, flddata))
 
 			geom = feat.GetGeometryRef()
-			attributes["Wkb"] = ogr.Geometry.ExportToWkb(geom)
-			attributes["Wkt"] = ogr.Geometry.ExportToWkt(geom)
-			attributes["Json"] = ogr.Geometry.ExportToJson(geom)
+			for key, export in self.exporters:
+				attributes[key] = export(geom)
 
 
 			graph.add_node((attributes['NodeID']), attributes)
@@ -2113,27 +2030,34 @@ class read:
 
 		'''
 
-		graph = {}
 		sql = ('SELECT * FROM	"Graphs" WHERE "GraphName" = \'%s\';' % prefix)
-		for row in self.conn.ExecuteSQL(sql):
-			res = row
-			keys = row.keys()
-		for key in keys:
-			graph[key] = res[key]
-
-		return graph
+		result = self.conn.ExecuteSQL(sql)
+		if result is None:
+			return None
+		try:
+			row = result.GetNextFeature()
+			if row is None:
+				return None
+			return dict((key, row[key]) for key in row.keys())
+		finally:
+			self.conn.ReleaseResultSet(result)
 
-	def pgnet(self, prefix):
+	def pgnet(self, prefix, geom_formats=('wkb', 'wkt', 'json')):
 		'''Read a network from PostGIS network schema tables.
 
 		Returns instance of networkx.Graph().
 
 		prefix - string - graph / network name
+		geom_formats - sequence - geometry attributes to store on nodes and edges, any of 'wkb', 'wkt' and 'json' (fewer formats read faster)
 
 		'''
 
 		# Set up variables
 		self.prefix = prefix
+		try:
+			self.exporters = [_GEOM_EXPORTERS[fmt.lower()] for fmt in geom_formats]
+		except KeyError as err:
+			raise Error('Geometry format not supported: %s.' % (err.args[0]))
 		# Get graph attributes
 		graph_attrs = self.graph_table(self.prefix)
 
@@ -2219,48 +2143,36 @@ class read:
 		elif ((directed == True) and (multigraph == True)):
 			net = nx.MultiDiGraph(name=network_name)
 
-		#disallowed values
-		disallowed_values = ['',"",'None',"None"]
+		#disallowed values, left as they are rather than given a type
+		disallowed_values = frozenset(('', 'None'))
+
+		#node and edge attribute types that can be assigned, as (field name, type) pairs
+		node_casts = [(column, cast) for column, cast in node_data_types.items() if cast in (str, int, float)]
+		edge_casts = [(column, cast) for column, cast in edge_data_types.items() if cast in (str, int, float)]
 
 		#set large field size limit to allow for massive linestring elements in edge geometry file
 		csv.field_size_limit(sys.maxsize)
 
 		#define node, edge, and edge geometry files
-		node_csv_file = open(node_csv_file_name, 'r')
-		edge_csv_file = open(edge_csv_file_name, 'r')
-		temp_edge_csv_file = open(edge_csv_file_name, 'r')
-		edge_geometry_csv_file = open(edge_geometry_csv_file_name, 'r')
+		node_csv_file = open(node_csv_file_name, 'r', newline='', buffering=_CSV_BUFFER_SIZE, encoding='utf-8')
+		edge_csv_file = open(edge_csv_file_name, 'r', newline='', buffering=_CSV_BUFFER_SIZE, encoding='utf-8')
+		edge_geometry_csv_file = open(edge_geometry_csv_file_name, 'r', newline='', buffering=_CSV_BUFFER_SIZE, encoding='utf-8')
 
 		#define node, edge, edge_geometry csv file readers
 		node_csv_reader = csv.DictReader(node_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
-		temp_edge_csv_reader = csv.DictReader(temp_edge_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
 		edge_csv_reader = csv.DictReader(edge_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
-		#edge_geometry_csv_reader = csv.DictReader(edge_geometry_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
-		edge_geometry_csv_reader = []
-
-		#NEW - to account for VERY long linestring geometries
-		first_edge_geometry_line = True
-
-		for line in edge_geometry_csv_file:
-			if first_edge_geometry_line == True:
-				first_edge_geometry_line = False
-				pos_first_comma = line.find(",")
-				first_col = line[:pos_first_comma]
-				second_col = line[(pos_first_comma+1):]
-			else:
-				if first_col == 'geom' or first_col == 'geom_text':
-					pos_first_comma = line.rfind(",")
-					geom_text = line[:pos_first_comma]
-					GeomID = line[(pos_first_comma+1):]
-				elif first_col == 'GeomID':
-					pos_first_comma = line.find(",")
-					geom_text = line[(pos_first_comma+1):]
-					GeomID = line[:pos_first_comma]
-				else:
-					raise Error('The first column within the Edge Geometry csv file must be either geom or geom_text, containing a WKT representation of the edge LINESTRING or the first column must be GeomID')
-
-				GeomID = int(GeomID)
-				edge_geometry_csv_reader.append({'GeomID':GeomID,'geom_text':geom_text})
+		#the positions of the GeomID and geometry columns are read once from the header
+		#(VERY long linestring geometries are allowed for by the field size limit above)
+		edge_geometry_csv_rows = csv.reader(edge_geometry_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL)
+		edge_geometry_header = next(edge_geometry_csv_rows, [])
+		if 'GeomID' not in edge_geometry_header or ('geom_text' not in edge_geometry_header and 'geom' not in edge_geometry_header):
+			raise Error('The Edge Geometry csv file must contain a GeomID column, and a geom or geom_text column containing a WKT representation of the edge LINESTRING')
+		geom_id_index = edge_geometry_header.index('GeomID')
+		if 'geom_text' in edge_geometry_header:
+			geom_text_index = edge_geometry_header.index('geom_text')
+		else:
+			geom_text_index = edge_geometry_header.index('geom')
+		edge_geometry_csv_reader = [{'GeomID':int(row[geom_id_index]), 'geom_text':row[geom_text_index]} for row in edge_geometry_csv_rows]
 
 		#generic Node table attributes
 		generic_node_fieldnames = []
@@ -2347,17 +2259,9 @@ class read:
 						del node_attrs['geom']
 
 					#assign correct data types to node attributes
-					for column in node_attrs:
-						if column in node_data_types:
-							if node_attrs[column] not in disallowed_values:
-								if node_data_types[column] == str:
-									node_attrs[column] = str(node_attrs[column])
-
-								if node_data_types[column] == int:
-									node_attrs[column] = int(node_attrs[column])
-
-								if node_data_types[column] == float:
-									node_attrs[column] = float(node_attrs[column])
+					for column, cast in node_casts:
+						if column in node_attrs and node_attrs[column] not in disallowed_values:
+							node_attrs[column] = cast(node_attrs[column])
 
 					#add the node to the network, with attributes
 					net.add_node(node_coord_tuple, node_attrs)
@@ -2412,18 +2316,9 @@ class read:
 					del node_attrs['geom']
 
 				#assign correct data types to node attributes
-				for column in node_attrs:
-					if column in node_data_types:
-
-						if node_attrs[column] not in disallowed_values:
-							if node_data_types[column] == str:
-								node_attrs[column] = str(node_attrs[column])
-
-							if node_data_types[column] == int:
-								node_attrs[column] = int(node_attrs[column])
-
-							if node_data_types[column] == float:
-								node_attrs[column] = float(node_attrs[column])
+				for column, cast in node_casts:
+					if column in node_attrs and node_attrs[column] not in disallowed_values:
+						node_attrs[column] = cast(node_attrs[column])
 
 				#add the node to the network, with attributes
 				net.add_node(node_coord_tuple, node_attrs)
@@ -2435,12 +2330,10 @@ class read:
 		if multigraph:
 			temp_edgeid_uuid_lookup = {}
 
-			for temp_edge_row in temp_edge_csv_reader:
-				temp_edgeid_uuid_lookup[int(temp_edge_row['EdgeID'])] = temp_edge_row['uuid']
-			#start again
-			temp_edge_csv_file.close()
-			del temp_edge_csv_reader
-			del temp_edge_csv_file
+			#read the edge uuids in a first pass over the edge file, only multigraphs need them
+			with open(edge_csv_file_name, 'r', newline='', buffering=_CSV_BUFFER_SIZE, encoding='utf-8') as temp_edge_csv_file:
+				for temp_edge_row in csv.DictReader(temp_edge_csv_file, delimiter=',', quoting=csv.QUOTE_MINIMAL):
+					temp_edgeid_uuid_lookup[int(temp_edge_row['EdgeID'])] = temp_edge_row['uuid']
 
 		#need to check that the edge_geometry csv file header contains at least the minimum edge_geometry fieldnames
 		edge_geometry_first_line = True
@@ -2483,8 +2376,8 @@ class read:
 					else:
 						raise Error('When reading a network back from csv files, the geometry of the edges must be contained as WKT string representation e.g. srid=27700;LINESTRING(0 0), in a column named either "geom_text" or "geom"')
 
-					edge_geometry_srid = edge_geometry_wkt_raw[1:edge_geometry_wkt_raw.find(';')]
-					edge_geometry_wkt = edge_geometry_wkt_raw[edge_geometry_wkt_raw.find(';')+1:len(edge_geometry_wkt_raw)-2]
+					edge_geometry_srid = edge_geometry_wkt_raw[:edge_geometry_wkt_raw.find(';')]
+					edge_geometry_wkt = edge_geometry_wkt_raw[edge_geometry_wkt_raw.find(';')+1:]
 
 					#if not empty geom
 					if edge_geometry_wkt.find('EMPTY') == -1:
@@ -2541,8 +2434,8 @@ class read:
 				else:
 					raise Error('When reading a network back from csv files, the geometry of the edges must be contained as WKT string representation e.g. srid=27700;LINESTRING(0 0), in a column named either "geom_text" or "geom"')
 
-				edge_geometry_srid = edge_geometry_wkt_raw[1:edge_geometry_wkt_raw.find(';')]
-				edge_geometry_wkt = edge_geometry_wkt_raw[edge_geometry_wkt_raw.find(';')+1:len(edge_geometry_wkt_raw)-2]
+				edge_geometry_srid = edge_geometry_wkt_raw[:edge_geometry_wkt_raw.find(';')]
+				edge_geometry_wkt = edge_geometry_wkt_raw[edge_geometry_wkt_raw.find(';')+1:]
 
 				#if not empty geom
 				if edge_geometry_wkt.find('EMPTY') == -1:
@@ -2631,18 +2524,9 @@ class read:
 						new_edge_attributes = dict(current_matched_edge_attributes, **edge_attrs)
 
 						#assign correct data types to edge attributes
-						for column in new_edge_attributes:
-							if column in edge_data_types:
-								if new_edge_attributes[column] not in disallowed_values:
-
-									if edge_data_types[column] == str:
-										new_edge_attributes[column] = str(new_edge_attributes[column])
-
-									if edge_data_types[column] == int:
-										new_edge_attributes[column] = int(new_edge_attributes[column])
-
-									if edge_data_types[column] == float:
-										new_edge_attributes[column] = float(new_edge_attributes[column])
+						for column, cast in edge_casts:
+							if column in new_edge_attributes and new_edge_attributes[column] not in disallowed_values:
+								new_edge_attributes[column] = cast(new_edge_attributes[column])
 
 						if multigraph:
 							uuid = temp_edgeid_uuid_lookup[edge_geom_id]
@@ -2681,17 +2565,9 @@ class read:
 					new_edge_attributes = dict(current_matched_edge_attributes, **edge_attrs)
 
 					#assign correct data types to edge attributes
-					for column in new_edge_attributes:
-						if column in edge_data_types:
-							if new_edge_attributes[column] not in disallowed_values:
-								if edge_data_types[column] == str:
-									new_edge_attributes[column] = str(new_edge_attributes[column])
-
-								if edge_data_types[column] == int:
-									new_edge_attributes[column] = int(new_edge_attributes[column])
-
-								if edge_data_types[column] == float:
-									new_edge_attributes[column] = float(new_edge_attributes[column])
+					for column, cast in edge_casts:
+						if column in new_edge_attributes and new_edge_attributes[column] not in disallowed_values:
+							new_edge_attributes[column] = cast(new_edge_attributes[column])
 
 					if multigraph:
 						uuid = temp_edgeid_uuid_lookup[edge_geom_id]
@@ -2735,17 +2611,9 @@ class read:
 						node_t_id = edge_attrs['Node_T_ID']
 
 						#assign correct data types for edge attributes
-						for column in edge_attrs:
-							if column in edge_data_types:
-								if edge_attrs[column] not in disallowed_values:
-									if edge_data_types[column] == str:
-										edge_attrs[column] = str(edge_attrs[column])
-
-									if edge_data_types[column] == int:
-										edge_attrs[column] = int(edge_attrs[column])
-
-									if edge_data_types[column] == float:
-										edge_attrs[column] = float(edge_attrs[column])
+						for column, cast in edge_casts:
+							if column in edge_attrs and edge_attrs[column] not in disallowed_values:
+								edge_attrs[column] = cast(edge_attrs[column])
 
 						if multigraph:
 							uuid = edge_attrs['uuid']
@@ -2766,17 +2634,9 @@ class read:
 					node_t_id = edge_attrs['Node_T_ID']
 
 					#assign correct data types for edge attributes
-					for column in edge_attrs:
-						if column in edge_data_types:
-							if edge_attrs[column] not in disallowed_values:
-								if edge_data_types[column] == str:
-									edge_attrs[column] = str(edge_attrs[column])
-
-								if edge_data_types[column] == int:
-									edge_attrs[column] = int(edge_attrs[column])
-
-								if edge_data_types[column] == float:
-									edge_attrs[column] = float(edge_attrs[column])
+					for column, cast in edge_casts:
+						if column in edge_attrs and edge_attrs[column] not in disallowed_values:
+							edge_attrs[column] = cast(edge_attrs[column])
 
 					if multigraph:
 						uuid = edge_attrs['uuid']
@@ -2803,6 +2663,16 @@ class write:
 		self.conn = db_conn
 		if self.conn == None:
 			raise Error('No connection to database.')
+		#layers found by getlayers, cleared when a network is deleted
+		self._layer_cache = {}
+		#edge rows waiting for flush_edges by column list, None to insert straight away
+		self._edge_rows = None
+		#NodeIDs by point coordinates while pgnet fills new tables, None to ask the database
+		self._node_geom_ids = None
+		#edges and hex wkb geometry queued while pgnet runs, None to write each edge at once
+		self._edge_geoms = None
+		#features reused by layer_feature while pgnet runs, None to make new ones
+		self._features = None
 
 	def getlayer(self, tablename):
 		'''Get a PostGIS table by name and return as OGR layer.
@@ -2813,13 +2683,66 @@ class write:
 
 		   '''
 
-		sql = "SELECT * from pg_tables WHERE tablename = '%s'" % tablename
+		return self.getlayers([tablename])[0]
 
-		for row in self.conn.ExecuteSQL(sql):
-			if row.tablename is None:
-				return None
-			else:
-				return self.conn.GetLayerByName(tablename)
+	def getlayers(self, tablenames):
+		'''Get several PostGIS tables by name and return as OGR layers.
+
+		   Tables not already known are looked up with a single query.
+		   Returns a list of OGR layers in the order of tablenames, with None
+		   for tables not in the current schema.
+
+		   tablenames - list - names of tables to return as OGR Layers
+
+		   '''
+
+		missing = [name for name in tablenames if name not in self._layer_cache]
+		if len(missing) > 0:
+			names = ', '.join(["'%s'" % name.replace("'", "''") for name in missing])
+			sql = ("SELECT tablename FROM pg_catalog.pg_tables WHERE schemaname = current_schema() AND tablename IN (%s)" % names)
+			result = self.conn.ExecuteSQL(sql)
+			if result is not None:
+				for row in result:
+					self._layer_cache[row.tablename] = self.conn.GetLayerByName(row.tablename)
+				self.conn.ReleaseResultSet(result)
+
+		return [self._layer_cache.get(name) for name in tablenames]
+
+	def copy_from_csv(self, tables):
+		'''Load csv files (with header row) into database tables using COPY.
+
+		Where psycopg2 is available each file is streamed from the client with
+		COPY ... FROM STDIN and all tables are loaded in a single transaction,
+		with their GIST indexes dropped beforehand and rebuilt once afterwards.
+		Otherwise the database server reads each file from the given path.
+
+		tables - list - (table name, csv file path) pairs, loaded in order. Table names must already be quoted if required.
+
+		'''
+		dbapi_conn = get_dbapi_connection(self.conn)
+
+		if dbapi_conn is None:
+			for tablename, csv_filename in tables:
+				sql = "COPY %s FROM '%s' DELIMITERS ',' CSV HEADER; " % (tablename, csv_filename)
+				self.conn.ExecuteSQL(sql)
+			return
+
+		cursor = dbapi_conn.cursor()
+		try:
+			indexdefs = drop_spatial_indexes(cursor, [tablename for tablename, csv_filename in tables])
+			for tablename, csv_filename in tables:
+				sql = "COPY %s FROM STDIN DELIMITERS ',' CSV HEADER" % (tablename)
+				with open(csv_filename, 'r') as csv_file:
+					cursor.copy_expert(sql, csv_file)
+			create_indexes(cursor, indexdefs)
+		except:
+			dbapi_conn.rollback()
+			raise
+		else:
+			dbapi_conn.commit()
+		finally:
+			cursor.close()
+			release_dbapi_connection(self.conn, dbapi_conn)
 
 	def netgeometry(self, key, data):
 		'''Create OGR geometry from a NetworkX Graph using Wkb/Wkt attributes.
@@ -2830,27 +2753,27 @@ class write:
 		'''
 
 		# Borrowed from nx_shp.py.
-		if 'Wkt' in data:
+		# Wkb first, it is cheaper to parse than Wkt (both are read from the same geometry)
+		if 'Wkb' in data:
+			geom = ogr.CreateGeometryFromWkb(bytes(data['Wkb']))
+		elif 'Wkt' in data:
 			geom = ogr.CreateGeometryFromWkt(data['Wkt'])
-		elif 'Wkb' in data:
-			geom = ogr.CreateGeometryFromWkb(str(data['Wkb']))
-		#elif type(key[0]) == 'tuple': # edge keys are packed tuples
 		#CHANGED FOR FIXING PAJEK IMPORT (29/11/2012)
-		elif ((type(key[0]) == 'tuple') or (type(key[0]) == tuple)): # edge keys are packed tuples
+		elif isinstance(key[0], tuple): # edge keys are packed tuples
 			geom = ogr.Geometry(ogr.wkbLineString)
 			#geom = ogr.Geometry(ogr.wkbMultiLineString)
 			_from, _to = key[0], key[1]
 			geom.SetPoint_2D(0, *_from)
 			geom.SetPoint_2D(1, *_to)
 		#CHANGED FOR FIXING GEXF IMPORT (04/12/2012)
-		elif ((type(key) == 'str') or (type(key) == str)):
-			coordinate_tuple = eval(key)
+		elif isinstance(key, str):
+			coordinate_tuple = ast.literal_eval(key)
 			geom = ogr.Geometry(ogr.wkbPoint)
 			geom.SetPoint_2D(0, *coordinate_tuple)
 		#CHANGED FOR FIXING GEPHI IMPORT (05/12/2012)
-		elif ((type(key[0]) == 'str') or (type(key[0]) == str)):
+		elif isinstance(key[0], str):
 			geom = ogr.Geometry(ogr.wkbLineString)
-			_from, _to = eval(key[0]), eval(key[1])
+			_from, _to = ast.literal_eval(key[0]), ast.literal_eval(key[1])
 			geom.SetPoint_2D(0, *_from)
 			geom.SetPoint_2D(1, *_to)
 		else:
@@ -2892,16 +2815,12 @@ class write:
 		'''
 
 		attrs = {}
-		OGRTypes = {int:ogr.OFTInteger, str:ogr.OFTString, float:ogr.OFTReal}
 		for key, data in g_obj.items():
-			if (key != 'Json' and key != 'Wkt' and key != 'Wkb' and key != 'ShpName' and key != 'NodeID' and key != 'nodeid' and key != 'EdgeID' and key != 'edgeid' and key != 'viewid' and key != 'view_id' and key != 'ViewID' and key != 'View_ID' and key != 'GeomID' and key != 'geomid' and key != 'geom' and key != 'geom_text'):
+			if key not in _ATTRIBUTE_MAP_SKIP_KEYS:
 
 				# Add new attributes for each feature
 				if key not in fields:
-					if type(data) in OGRTypes:
-						fields[key] = OGRTypes[type(data)]
-					else:
-						fields[key] = ogr.OFTString
+					fields[key] = _OGR_TYPES.get(type(data), ogr.OFTString)
 
 					newfield = ogr.FieldDefn(key, fields[key])
 					lyr.CreateField(newfield)
@@ -2911,19 +2830,74 @@ class write:
 					attrs[key] = data
 		return attrs
 
-	def update_graph_table(self):
+	def update_graph_table(self, directed=False, multigraph=False):
 		'''Update the Graph table and return newly assigned Graph ID.
 
-		graph - networkx graph
+		The record is added by ni_add_graph_record and its id read back with
+		currval on this connection, so graphs written by other connections at
+		the same time do not interfere.
+
+		directed - boolean - true if a directed network will be written, false otherwise
+		multigraph - boolean - true if a multigraph network will be written, false otherwise
 
 		'''
 		#add a graph record based on the prefix (graph / network name)
-		result = nisql(self.conn).add_graph_record(self.prefix)
-		sql = ('SELECT "GraphID" FROM "Graphs" ORDER BY "GraphID" DESC LIMIT 1;')
-		GraphID = None
-		for row in self.conn.ExecuteSQL(sql):
-			GraphID = row.GraphID
-		return GraphID
+		nisql(self.conn).add_graph_record(self.prefix, bool(directed), bool(multigraph))
+		sql = ('''SELECT currval(pg_get_serial_sequence('"Graphs"', 'GraphID')) AS "GraphID";''')
+		return nisql(self.conn)._scalar(sql, 'GraphID')
+
+	def created_id(self, lyr, feature, table, column):
+		'''Return the primary key of a feature just written with CreateFeature.
+
+		The PostgreSQL driver inserts with RETURNING and sets the feature FID
+		when the serial primary key is the layer FID column, so no query is
+		needed. Otherwise the newest key is read back from the table.
+
+		lyr - OGR layer the feature was created in
+		feature - OGR feature passed to lyr.CreateFeature
+		table - string - name of table behind lyr
+		column - string - name of serial primary key column e.g. NodeID
+
+		'''
+		if lyr.GetFIDColumn() == column and feature.GetFID() != ogr.NullFID:
+			return feature.GetFID()
+
+		ID = None
+		sql = ('SELECT "%s" FROM "%s" ORDER BY "%s" DESC LIMIT 1;' % (column, table, column))
+		result = self.conn.ExecuteSQL(sql)
+		if result is not None:
+			try:
+				row = result.GetNextFeature()
+				if row is not None:
+					ID = row.GetField(0)
+			finally:
+				self.conn.ReleaseResultSet(result)
+		return ID
+
+	def layer_feature(self, lyr, fields):
+		'''Return a feature for a layer, ready for fields to be set and CreateFeature.
+
+		While pgnet runs, one feature per layer is reused and fields set for
+		the last row but not in fields are unset, otherwise a new feature is
+		returned.
+
+		lyr - OGR layer
+		fields - iterable - names of the fields that will be set on the feature
+
+		'''
+		if self._features is None:
+			return ogr.Feature(lyr.GetLayerDefn())
+
+		name = lyr.GetName()
+		if name in self._features:
+			feature, set_fields = self._features[name]
+			feature.SetFID(ogr.NullFID)
+			for field in set_fields.difference(fields):
+				feature.UnsetField(field)
+		else:
+			feature = ogr.Feature(lyr.GetLayerDefn())
+		self._features[name] = (feature, set(fields))
+		return feature
 
 	def pgnet_edge_empty_geometry(self, edge_attribute_equality_key, edge_attributes, edge_geom):
 		'''Write a Edge to a Edge table, where no Edge geometry exists
@@ -2934,26 +2908,18 @@ class write:
 		edge_attributes - dict - dictionary of edge attributes to add to a edge feature
 		'''
 
-		#Get table definitions
-		featedge = ogr.Feature(self.lyredges.GetLayerDefn())
-		featedge_geom = ogr.Feature(self.lyredge_geom.GetLayerDefn())
+		featedge_geom = self.layer_feature(self.lyredge_geom, ())
 		featedge_geom.SetGeometry(edge_geom)
 
 		self.lyredge_geom.CreateFeature(featedge_geom)
-		sql = ('SELECT "GeomID" FROM "%s" ORDER BY "GeomID" DESC LIMIT 1;' % self.tbledge_geom)
-
-		for row in self.conn.ExecuteSQL(sql):
-			GeomID = row.GeomID
+		GeomID = self.created_id(self.lyredge_geom, featedge_geom, self.tbledge_geom, 'GeomID')
 
 		# Append the GeomID to the edges attributes
 		edge_attributes['Edge_GeomID'] = GeomID
 
 		#Attributes to edges table
-		##for field, data in edge_attributes.iteritems():
-		for field, data in list(edge_attributes.items()):
-			if type(data) == str:
-				data = data.encode('utf-8')
-
+		featedge = self.layer_feature(self.lyredges, edge_attributes)
+		for field, data in edge_attributes.items():
 			featedge.SetField(field, data)
 
 		self.lyredges.CreateFeature(featedge)
@@ -2969,31 +2935,74 @@ class write:
 		#convert linestrings to multiline strings
 		'''if edge_geom.ExportToWkt()[:10] == 'LINESTRING':
 			edge_geom = ogr.ForceToMultiLineString(edge_geom)'''
-		#get the edge wkt
-		edge_wkt = edge_geom.ExportToWkt()
-		
-		# Get table definitions
-		featedge = ogr.Feature(self.lyredges.GetLayerDefn())
-		featedge_geom = ogr.Feature(self.lyredge_geom.GetLayerDefn())
+		#while pgnet runs, edge geometry is matched and written EDGE_BATCH_SIZE edges at a time
+		if self._edge_geoms is not None:
+			self._edge_geoms.append((edge_attributes, _hex_wkb(edge_geom)))
+			if len(self._edge_geoms) >= EDGE_BATCH_SIZE:
+				self.flush_edge_geometries()
+			return
 
 		# Test for geometry existance
-		GeomID = nisql(self.conn).edge_geometry_equality_check(self.prefix, edge_wkt, self.srs)
+		GeomID = nisql(self.conn).edge_geometry_equality_check(self.prefix, edge_geom.ExportToWkt(), self.srs)
 
 		if GeomID == None:
 			# Need to create new geometry
+			featedge_geom = self.layer_feature(self.lyredge_geom, ())
 			featedge_geom.SetGeometry(edge_geom)
 			
 			self.lyredge_geom.CreateFeature(featedge_geom)
 			
 			#Get created edge_geom primary key (GeomID)
-			sql = ('SELECT "GeomID" FROM "%s" ORDER BY "GeomID" DESC LIMIT 1;' % self.tbledge_geom)
-			
-			for row in self.conn.ExecuteSQL(sql):
-				GeomID = row.GeomID
+			GeomID = self.created_id(self.lyredge_geom, featedge_geom, self.tbledge_geom, 'GeomID')
 		
 		# Append the GeomID to the edges attributes
 		edge_attributes['Edge_GeomID'] = GeomID
+		self.insert_edge(edge_attributes)
+
+	def flush_edge_geometries(self):
+		'''Match and write the edge geometries queued by pgnet_edge, then queue their edges.
+
+		One statement inserts the geometries not ST_Equals to a row of the
+		Edge_Geometry table or to an earlier geometry of the batch, and returns
+		the GeomID of every queued geometry, as ni_edge_geometry_equality_check
+		would find it.
+
+		'''
+		if not self._edge_geoms:
+			return
+		geometry_column = self.lyredge_geom.GetGeometryColumn()
+		batch = ','.join("(%i, ST_GeomFromWKB(decode('%s', 'hex'), %i))" % (index, wkb, self.srs)
+			for index, (edge_attributes, wkb) in enumerate(self._edge_geoms))
+		sql = ('''WITH batch (i, geom) AS (VALUES %s), '''
+			'''new AS (INSERT INTO "%s" ("%s") SELECT b.geom FROM batch b '''
+			'''WHERE NOT EXISTS (SELECT 1 FROM "%s" g WHERE ST_Equals(g."%s", b.geom)) '''
+			'''AND NOT EXISTS (SELECT 1 FROM batch c WHERE c.i < b.i AND ST_Equals(c.geom, b.geom)) ORDER BY b.i '''
+			'''RETURNING "GeomID", "%s" AS geom) '''
+			'''SELECT b.i, COALESCE((SELECT min(g."GeomID") FROM "%s" g WHERE ST_Equals(g."%s", b.geom)), '''
+			'''(SELECT min(n."GeomID") FROM new n WHERE ST_Equals(n.geom, b.geom))) FROM batch b''' % (batch,
+			self.tbledge_geom, geometry_column, self.tbledge_geom, geometry_column, geometry_column,
+			self.tbledge_geom, geometry_column))
+		result = self.conn.ExecuteSQL(sql)
+		if result is None:
+			raise Error('Could not insert data into database. SQL: %s' % sql)
+		try:
+			geom_ids = dict((feature.GetField(0), feature.GetField(1)) for feature in result)
+		finally:
+			self.conn.ReleaseResultSet(result)
+
+		for index, (edge_attributes, wkb) in enumerate(self._edge_geoms):
+			if geom_ids.get(index) is None:
+				raise Error('No GeomID was returned for the edge geometry %s. SQL: %s' % (wkb, sql))
+			edge_attributes['Edge_GeomID'] = geom_ids[index]
+			self.insert_edge(edge_attributes)
+		del self._edge_geoms[:]
+
+	def insert_edge(self, edge_attributes):
+		'''Write an edge row to the Edge table, queued for a multi-row INSERT while pgnet runs.
+
+		edge_attributes - dictionary of edge attributes, including Edge_GeomID
 
+		'''
 		'''
 		#this is the original way but I think something is going wrong when doing this
 		#Attributes to edges table
@@ -3011,7 +3020,7 @@ class write:
 		data_list = ''
 		for field, data in list(edge_attributes.items()):
 
-			if type(data) == int or type(data) == float:
+			if isinstance(data, (int, float)):
 				data_list += '%s,' %data
 				field_list += '"%s",' % field
 			elif data == None:
@@ -3021,6 +3030,13 @@ class write:
 				data_list += "'%s'," % data.replace("'", "''")
 				field_list += '"%s",' % field
 
+		#edge rows need no id back, so pgnet queues them for multi-row inserts
+		if self._edge_rows is not None:
+			self._edge_rows.setdefault(field_list[:-1], []).append(data_list[:-1])
+			if len(self._edge_rows[field_list[:-1]]) >= EDGE_BATCH_SIZE:
+				self.flush_edges()
+			return
+
 		sql = '''INSERT INTO "%s" (%s) VALUES (%s)''' %(self.tbledges,field_list[:-1],data_list[:-1])
 
 		try:
@@ -3028,6 +3044,104 @@ class write:
 		except:
 			raise Error('Could not insert data into database. SQL: %s' %sql)
 
+	def flush_edges(self):
+		'''Insert edge rows queued by pgnet_edge, one statement per column list.'''
+		if not self._edge_rows:
+			return
+		for field_list, rows in list(self._edge_rows.items()):
+			sql = '''INSERT INTO "%s" (%s) VALUES (%s)''' %(self.tbledges, field_list, '),('.join(rows))
+			try:
+				self.conn.ExecuteSQL(sql)
+			except:
+				raise Error('Could not insert data into database. SQL: %s' %sql)
+		self._edge_rows.clear()
+
+	def pgnet_nodes(self, network, node_fields, graph_id):
+		'''Write the nodes on edges of a network to the Node table, NODE_BATCH_SIZE
+		rows per INSERT, and return their NodeIDs by node.
+
+		Nodes with the same coordinates share one row, as with pgnet_node.
+		NodeIDs are read back with RETURNING, together with the geometry as
+		hex wkb to match them to their rows (RETURNING rows are in no set order).
+
+		network - networkx network
+		node_fields - dict - node fields, as created by create_attribute_map
+		graph_id - integer - GraphID of network
+
+		'''
+		#table column names of the node fields (OGR field names are case insensitive)
+		defn = self.lyrnodes.GetLayerDefn()
+		fields = list(node_fields)
+		columns = []
+		for field in fields:
+			index = defn.GetFieldIndex(field)
+			if index > -1:
+				columns.append(defn.GetFieldDefn(index).GetName())
+			else:
+				columns.append(field)
+		geometry_column = self.lyrnodes.GetGeometryColumn()
+		columns.append(geometry_column)
+		column_list = ','.join('"%s"' % column for column in columns)
+
+		node_ids = {}
+		#nodes by coordinates of the rows waiting to be inserted
+		pending = {}
+		rows = []
+
+		def flush():
+			sql = '''INSERT INTO "%s" (%s) VALUES (%s) RETURNING "NodeID", encode(ST_AsBinary("%s", 'NDR'), 'hex')''' % (self.tblnodes, column_list, '),('.join(row for coords, wkb, row in rows), geometry_column)
+			result = self.conn.ExecuteSQL(sql)
+			if result is None:
+				raise Error('Could not insert data into database. SQL: %s' % sql)
+			try:
+				returned_ids = dict((feature.GetField(1), feature.GetField(0)) for feature in result)
+			finally:
+				self.conn.ReleaseResultSet(result)
+			for coords, wkb, row in rows:
+				if wkb not in returned_ids:
+					raise Error('No NodeID was returned for the node at %s. SQL: %s' % (str(coords), sql))
+				NodeID = returned_ids[wkb]
+				self._node_geom_ids[coords] = NodeID
+				for node in pending[coords]:
+					node_ids[node] = NodeID
+			pending.clear()
+			del rows[:]
+
+		for node, data in network.nodes(data=True):
+			if network.degree(node) == 0:
+				continue
+			node_geom = self.netgeometry(node, data)
+			coords = (node_geom.GetX(), node_geom.GetY())
+			if coords in self._node_geom_ids:
+				node_ids[node] = self._node_geom_ids[coords]
+				continue
+			if coords in pending:
+				pending[coords].append(node)
+				continue
+			pending[coords] = [node]
+
+			values = []
+			for field in fields:
+				if field == 'GraphID':
+					value = graph_id
+				else:
+					value = data.get(field)
+				if value is None:
+					values.append('NULL')
+				elif isinstance(value, bool):
+					values.append('%i' % value)
+				else:
+					values.append(_quote(value))
+			wkb = _hex_wkb(node_geom)
+			values.append("ST_GeomFromWKB(decode('%s', 'hex'), %i)" % (wkb, self.srs))
+			rows.append((coords, wkb, ','.join(values)))
+
+			if len(rows) >= NODE_BATCH_SIZE:
+				flush()
+		if rows:
+			flush()
+
+		return node_ids
 
 	def pgnet_node_empty_geometry(self, node_attribute_equality_key, node_attributes, node_geom):
 		'''Write a node to a Node table, where no Node geometry exists
@@ -3042,20 +3156,14 @@ class write:
 			NodeID = nisql(self.conn).node_attribute_equality_check(self.prefix, node_attribute_equality_key, node_attributes[node_attribute_equality_key])
 
 			if NodeID == None: #Need to create the new feature+geometry
-				featnode = ogr.Feature(self.lyrnodes_def)
+				featnode = self.layer_feature(self.lyrnodes, node_attributes)
 				featnode.SetGeometry(node_geom)
 				for field, data in node_attributes.items():
-					if type(data) == str:
-						data = data.encode('utf-8')
-
 					featnode.SetField(field, data)
 
 				self.lyrnodes.CreateFeature(featnode)
 
-				sql = ('SELECT "NodeID" FROM "%s" ORDER BY "NodeID" DESC LIMIT 1;' % self.tblnodes)
-
-				for row in self.conn.ExecuteSQL(sql):
-					NodeID = row.NodeID
+				NodeID = self.created_id(self.lyrnodes, featnode, self.tblnodes, 'NodeID')
 
 			return NodeID
 
@@ -3072,10 +3180,16 @@ class write:
 		node_geom - OGR geometry - geometry of node to write to database
 
 		'''
-		NodeID = nisql(self.conn).node_geometry_equality_check(self.prefix,node_geom,self.srs)
+		if self._node_geom_ids is not None:
+			#every node in the table was written by this pgnet call, so the
+			#geometry check (ST_Equals, for points equal coordinates) is done here
+			node_key = (node_geom.GetX(), node_geom.GetY())
+			NodeID = self._node_geom_ids.get(node_key)
+		else:
+			NodeID = nisql(self.conn).node_geometry_equality_check(self.prefix,node_geom,self.srs)
 		
 		if NodeID == None: # Need to create new geometry:
-			featnode = ogr.Feature(self.lyrnodes_def)
+			featnode = self.layer_feature(self.lyrnodes, node_attributes)
 			featnode.SetGeometry(node_geom)
 
 			for field, data in node_attributes.items():
@@ -3092,9 +3206,9 @@ class write:
 			self.lyrnodes.CreateFeature(featnode)
 
 			# getting node id
-			sql = ('SELECT "NodeID" FROM "%s" ORDER BY "NodeID" DESC LIMIT 1;' % self.tblnodes)
-			for row in self.conn.ExecuteSQL(sql):
-				NodeID = row.NodeID
+			NodeID = self.created_id(self.lyrnodes, featnode, self.tblnodes, 'NodeID')
+			if self._node_geom_ids is not None:
+				self._node_geom_ids[node_key] = NodeID
 
 		return NodeID
 
@@ -3135,6 +3249,7 @@ class write:
 		#check if network tables were created
 		if result == 0 or result == None:
 			if overwrite is True:
+				self._layer_cache.clear()
 				nisql(self.conn).delete_network(self.prefix)
 				result = nisql(self.conn).create_network_tables(self.prefix, self.srs, directed, multigraph)
 				if result == None:
@@ -3145,129 +3260,147 @@ class write:
 		G = network # Use G as network, networkx convention.
 
 		#grab graph / network id from database
-		graph_id = self.update_graph_table()
+		graph_id = self.update_graph_table(directed, multigraph)
 		self.graph_id = graph_id
 		if graph_id == None:
 	     		raise Error('Could not load network from Graphs table.')
 
-		self.lyredges = self.getlayer(self.tbledges)
-		self.lyrnodes = self.getlayer(self.tblnodes)
-		self.lyredge_geom = self.getlayer(self.tbledge_geom)
+		self.lyredges, self.lyrnodes, self.lyredge_geom = self.getlayers([self.tbledges, self.tblnodes, self.tbledge_geom])
 		self.lyrnodes_def =  self.lyrnodes.GetLayerDefn()
 
 		#define default field types for Node and Edge fields
 		node_fields = {'GraphID':ogr.OFTInteger}
 		edge_fields = {'Node_F_ID':ogr.OFTInteger, 'Node_T_ID':ogr.OFTInteger, 'GraphID':ogr.OFTInteger, 'Edge_GeomID':ogr.OFTInteger}
-		
-		for e in G.edges(data=True):
-			if not multigraph:
-				data = G.get_edge_data(*e)
-			else:
-				data = G.get_edge_data(e[0], e[1], e[2]['uuid'])
-
-			# Insert the start node
-			node_attrs = self.create_attribute_map(self.lyrnodes, G.node[e[0]], node_fields)
-			node_attrs['GraphID'] = graph_id
 
-			#delete view_id and nodeid if exist as attributes of node
-			if 'view_id' in node_attrs:
-				del node_attrs['view_id']
-			if 'nodeid' in node_attrs:
-				del node_attrs['nodeid']
-			
+		# Create all node and edge attribute fields in one pass, so the write
+		# loop below never has to issue DDL and only copies known fields
+		# (only nodes on an edge are written)
+		for n, n_data in G.nodes(data=True):
+			if G.degree(n) > 0:
+				self.create_attribute_map(self.lyrnodes, n_data, node_fields)
+		for u, v, data in G.edges(data=True):
+			self.create_attribute_map(self.lyredges, data, edge_fields)
+
+		#aspatial networks write the same empty geometries every time, made once
+		#here (features copy the geometry they are given)
+		if srs == -1:
+			empty_node_geom = ogr.CreateGeometryFromWkt('POINT EMPTY')
+			empty_edge_geom = ogr.CreateGeometryFromWkt('LINESTRING EMPTY')
+
+		#database ids of nodes, and edge data with end node ids, set on the network after writing
+		node_ids = {}
+		edge_ids = []
+
+		#write every node and edge in one transaction rather than one per feature,
+		#edges and their geometry are written EDGE_BATCH_SIZE rows at a time and
+		#node geometry is matched in memory, the tables were created empty above
+		self._edge_rows = {}
+		self._node_geom_ids = {}
+		self._edge_geoms = []
+		self._features = {}
+		self.conn.StartTransaction()
+		try:
+			#spatial nodes are all inserted first, NODE_BATCH_SIZE rows at a time
 			if srs != -1:
-				#grab the node geometry
-				node_geom = self.netgeometry(e[0], G.node[e[0]])
-				#write the geometry to the database, and return the id
-				node_f_id = self.pgnet_node(node_attrs, node_geom)
-				if node_f_id == None:
-					print('Leaving code here as from id is none')
-					exit()
-
-			else:
-				node_geom = self.netgeometry(e[0], {'Wkt':'POINT EMPTY'})
-
-				#write the geometry to the database, and return the id
-				node_f_id = self.pgnet_node_empty_geometry(node_equality_key, node_attrs, node_geom)
-
-			#in case something goes wrong
-			if node_f_id == None:
-				print('Exiting code here as from id is none.')
-				exit()
-			#set edge from id
-			G[e[0]][e[1]]['Node_F_ID'] = node_f_id
+				node_ids = self.pgnet_nodes(G, node_fields, graph_id)
 
-			#reset NodeID (NEW)
-			G[e[0]]['NodeID'] = node_f_id
+			#edge data is the edge's own attribute dict, no need to look it up again
+			for u, v, data in G.edges(data=True):
+				u_data = G.node[u]
+				v_data = G.node[v]
 
-			#if node_attrs.has_key('NodeID'): # NEW
-			node_attrs['NodeID'] = node_f_id
-
-			# Insert the end node
-			node_attrs = self.create_attribute_map(self.lyrnodes, G.node[e[1]], node_fields)
-			#node_attrs = node_fields
-			node_attrs['GraphID'] = graph_id
-
-
-			#delete view_id and nodeid if exist as attributes of node
-			if 'view_id' in node_attrs:
-				del node_attrs['view_id']
-			if 'nodeid' in node_attrs:
-				del node_attrs['nodeid']
+				# Insert the start node, once however many edges it is on
+				if u in node_ids:
+					node_f_id = node_ids[u]
+				else:
+					node_attrs = {key: value for key, value in u_data.items() if key in node_fields}
+					node_attrs['GraphID'] = graph_id
 			
-			if srs != -1:
-				#grab the node geometry
-				node_geom = self.netgeometry(e[1], G.node[e[1]])
+					if srs != -1:
+						#grab the node geometry
+						node_geom = self.netgeometry(u, u_data)
+						#write the geometry to the database, and return the id
+						node_f_id = self.pgnet_node(node_attrs, node_geom)
 
-				#write the geometry to the database, and return the id
-				node_t_id = self.pgnet_node(node_attrs, node_geom)
-
-			else:
-				node_geom = self.netgeometry(e[1], {'Wkt':'POINT EMPTY'})
+					else:
+						node_geom = empty_node_geom
 
-				#write the geometry to the database, and return the id
-				node_t_id = self.pgnet_node_empty_geometry(node_equality_key, node_attrs, node_geom)
+						#write the geometry to the database, and return the id
+						node_f_id = self.pgnet_node_empty_geometry(node_equality_key, node_attrs, node_geom)
 
-			#set edge to id
-			G[e[0]][e[1]]['Node_T_ID'] = node_t_id
+					#in case something goes wrong
+					if node_f_id == None:
+						raise Error('Could not write node %s to table %s.' % (u, self.tblnodes))
+					node_ids[u] = node_f_id
 
-			G[e[1]]['Node_T_ID'] = node_t_id
+				# Insert the end node, once however many edges it is on
+				if v in node_ids:
+					node_t_id = node_ids[v]
+				else:
+					node_attrs = {key: value for key, value in v_data.items() if key in node_fields}
+					node_attrs['GraphID'] = graph_id
+			
+					if srs != -1:
+						#grab the node geometry
+						node_geom = self.netgeometry(v, v_data)
 
-			#reset NodeID (NEW)
-			node_attrs['NodeID'] = node_t_id
+						#write the geometry to the database, and return the id
+						node_t_id = self.pgnet_node(node_attrs, node_geom)
 
-			# Set graph id.
-			G[e[0]][e[1]]['GraphID'] = graph_id
+					else:
+						node_geom = empty_node_geom
 
-			#set the edge attributes
-			edge_attrs = self.create_attribute_map(self.lyredges, e[2], edge_fields)
+						#write the geometry to the database, and return the id
+						node_t_id = self.pgnet_node_empty_geometry(node_equality_key, node_attrs, node_geom)
 
+					#in case something goes wrong
+					if node_t_id == None:
+						raise Error('Could not write node %s to table %s.' % (v, self.tblnodes))
+					node_ids[v] = node_t_id
+				edge_ids.append((data, node_f_id, node_t_id))
 
-			if 'edgeid' in edge_attrs:
-				del edge_attrs['edgeid']
-			if 'geomid' in edge_attrs:
-				del edge_attrs['geomid']
+				#set the edge attributes
+				edge_attrs = {key: value for key, value in data.items() if key in edge_fields}
 
-			#NEW
-			if 'Node_F_ID' in edge_attrs:
+				#NEW
 				edge_attrs['Node_F_ID'] = node_f_id
-			if 'Node_T_ID' in edge_attrs:
 				edge_attrs['Node_T_ID'] = node_t_id
-			if 'GraphID' in edge_attrs:
 				edge_attrs['GraphID'] = self.graph_id
 			
-			if srs != -1:
+				if srs != -1:
 
-				#define the edge geometry
-				edge_geom = self.netgeometry(e, data)
+					#define the edge geometry
+					edge_geom = self.netgeometry((u, v), data)
 
-				#add the edge and attributes to the database
-				self.pgnet_edge(edge_attrs, edge_geom)
-			else:
-				edge_geom = self.netgeometry(e, {'Wkt':'LINESTRING EMPTY'})
+					#add the edge and attributes to the database
+					self.pgnet_edge(edge_attrs, edge_geom)
+				else:
+					edge_geom = empty_edge_geom
 
-				#add the edge and attributes to the database
-				self.pgnet_edge_empty_geometry(edge_equality_key, edge_attrs, edge_geom)
+					#add the edge and attributes to the database
+					self.pgnet_edge_empty_geometry(edge_equality_key, edge_attrs, edge_geom)
+
+			#insert any edges still queued
+			self.flush_edge_geometries()
+			self.flush_edges()
+		except:
+			self.conn.RollbackTransaction()
+			raise
+		else:
+			self.conn.CommitTransaction()
+		finally:
+			self._edge_rows = None
+			self._node_geom_ids = None
+			self._edge_geoms = None
+			self._features = None
+
+		#set the database ids on the network, edge data is the dict held by G.edge[u][v]
+		for node, node_id in node_ids.items():
+			G.node[node]['NodeID'] = node_id
+		for data, node_f_id, node_t_id in edge_ids:
+			data['Node_F_ID'] = node_f_id
+			data['Node_T_ID'] = node_t_id
+			data['GraphID'] = graph_id
 
 		#execute create node view
 		nisql(self.conn).create_node_view(self.prefix)
@@ -3285,14 +3418,10 @@ class write:
 
 		'''
 		attrs = {}
-		OGRTypes = {int:ogr.OFTInteger, str:ogr.OFTString, float:ogr.OFTReal}
 		for key, data in g_obj.items():
-			if (key != 'Json' and key != 'Wkt' and key != 'Wkb' and key != 'ShpName' and key != 'nodeid' and key != 'edgeid' and key != 'viewid' and key != 'view_id' and key != 'geomid' and key != 'GeomID' and key != 'EdgeID' and key != 'NodeID' and key != 'geom_text'):
+			if key not in _ATTRIBUTE_FIELD_SKIP_KEYS:
 				if key not in fields:
-					if type(data) in OGRTypes:
-						fields[key] = OGRTypes[type(data)]
-					else:
-						fields[key] = ogr.OFTString
+					fields[key] = _OGR_TYPES.get(type(data), ogr.OFTString)
 					newfield = ogr.FieldDefn(key, fields[key])
 					lyr.CreateField(newfield)
 					attrs[key] = data
@@ -3347,15 +3476,14 @@ class write:
 		#create network tables
 		if result == 0 or result == None:
 			if overwrite is True:
+				self._layer_cache.clear()
 				nisql(self.conn).delete_network(self.prefix)
 				nisql(self.conn).create_network_tables(self.prefix, self.srs, directed, multigraph)
 			else:
 				raise Error('Network already exists.')
 
 		#set the node, edge and edge_geometry tables
-		self.lyredges = self.getlayer(self.tbledges)
-		self.lyrnodes = self.getlayer(self.tblnodes)
-		self.lyredge_geom = self.getlayer(self.tbledge_geom)
+		self.lyredges, self.lyrnodes, self.lyredge_geom = self.getlayers([self.tbledges, self.tblnodes, self.tbledge_geom])
 
 		#set the network
 		G = network
@@ -3428,7 +3556,7 @@ class write:
 		edge_geometry_csv_writer.writerow(edge_geometry_table_fieldnames)
 
 		#this OK to leave in the CSV writing version of the function because we need the correct GraphID inside each CSV file
-		graph_id = self.update_graph_table()
+		graph_id = self.update_graph_table(directed, multigraph)
 
 		if graph_id == None:
 			raise Error('Could not load network from Graphs table.')
@@ -3454,22 +3582,15 @@ class write:
 		#GeomID, geom
 		edge_geometry_attrs = []
 
-		#to store records of all
-		node_ids = []
-		node_coords = []
+		#node ids written so far, by node geometry wkt
+		node_coord_ids = {}
 
 		from_check = False
 
 		#loop all edges in the network
 		for e in G.edges(data=True):
-			#do we need to do this slightly differently for a directed multigraph?
-
-			#get the data for the current edge in the network
-
-			if not multigraph:
-				data = G.get_edge_data(*e)
-			else:
-				data = G.get_edge_data(e[0], e[1], e[2]['uuid'])
+			#the edge tuple carries the edge's own attribute dict
+			data = e[2]
 
 			#get from node geometry as wkt
 			node_from_geom = self.netgeometry(e[0], G.node[e[0]])
@@ -3509,16 +3630,15 @@ class write:
 			node_from_attrs = []
 
 			#perform check to see if node already exists
-			if node_from_geom_wkt in node_coords:
+			if node_from_geom_wkt in node_coord_ids:
 				#from node already exists
-				node_from_id = (node_ids[node_coords.index(node_from_geom_wkt)])
+				node_from_id = node_coord_ids[node_from_geom_wkt]
 				from_check = False
 			else:
 				#GraphID
 				node_from_attrs.append(graph_id)
 				node_from_id = current_node_id
-				node_ids.append(node_from_id)
-				node_coords.append(node_from_geom_wkt)
+				node_coord_ids[node_from_geom_wkt] = node_from_id
 				current_node_id = node_from_id
 				from_check = True
 				######BIG CHANGE
@@ -3547,9 +3667,9 @@ class write:
 			node_to_attrs = []
 
 			#perform check to see if node already exists
-			if node_to_geom_wkt in node_coords:
+			if node_to_geom_wkt in node_coord_ids:
 				#to node already exists
-				node_to_id = (node_ids[node_coords.index(node_to_geom_wkt)])
+				node_to_id = node_coord_ids[node_to_geom_wkt]
 			else:
 				 #GraphID
 				node_to_attrs.append(graph_id)
@@ -3558,8 +3678,7 @@ class write:
 				else:
 					node_to_id = current_node_id
 				from_check = False
-				node_ids.append(node_to_id)
-				node_coords.append(node_to_geom_wkt)
+				node_coord_ids[node_to_geom_wkt] = node_to_id
 				current_node_id = node_to_id
 				######BIG CHANGE
 				node_to_attrs.append(node_to_geom_wkt_final)
@@ -3635,9 +3754,8 @@ class write:
 			#need to write the contents of the edge_attrs to the edge table
 			edge_csv_writer.writerow(edge_attrs)
 
-		#delete dictionaries of node ids and coordinates
-		del node_ids
-		del node_coords
+		#delete dictionary of node ids by coordinates
+		del node_coord_ids
 
 		#close csv files
 		node_csv_file.close()
@@ -3655,19 +3773,10 @@ class write:
 		else:
 			tblnodes = self.tblnodes
 			tbledge_geom = self.tbledge_geom
-			tbledges = self.tbledge
-
-		#load the nodes
-		node_load_sql_from_csv = "COPY %s FROM '%s' DELIMITERS ',' CSV HEADER; " % (tblnodes, node_csv_filename)
-		self.conn.ExecuteSQL(node_load_sql_from_csv)
+			tbledges = self.tbledges
 
-		#load the edge geometry
-		edge_geometry_load_sql_from_csv = "COPY %s FROM '%s' DELIMITERS ',' CSV HEADER; " % (tbledge_geom, edge_geom_csv_filename)
-		self.conn.ExecuteSQL(edge_geometry_load_sql_from_csv)
-
-		#load the edges
-		edge_sql_from_csv = "COPY %s FROM '%s' DELIMITERS ',' CSV HEADER; " % (tbledges, edge_csv_filename)
-		self.conn.ExecuteSQL(edge_sql_from_csv)
+		#load the nodes, edge geometry and edges
+		self.copy_from_csv([(tblnodes, node_csv_filename), (tbledge_geom, edge_geom_csv_filename), (tbledges, edge_csv_filename)])
 
 		#execute create node view sql
 		nisql(self.conn).create_node_view(self.prefix)
@@ -3715,17 +3824,16 @@ class write:
 		#create network tables
 		if result == 0 or result == None:
 			if overwrite is True:
+				self._layer_cache.clear()
 				nisql(self.conn).delete_network(self.prefix)
 				nisql(self.conn).create_network_tables(self.prefix, self.srs, directed, multigraph)
 			else:
 				raise Error('Network already exists.')
 
-		self.lyredges = self.getlayer(self.tbledges)
-		self.lyrnodes = self.getlayer(self.tblnodes)
-		self.lyredge_geom = self.getlayer(self.tbledge_geom)
+		self.lyredges, self.lyrnodes, self.lyredge_geom = self.getlayers([self.tbledges, self.tblnodes, self.tbledge_geom])
 
 		#this OK to leave in the CSV writing version of the function because we need the correct GraphID inside each CSV file
-		graph_id = self.update_graph_table()
+		graph_id = self.update_graph_table(directed, multigraph)
 
 		#defines the 'base' fields for each table type (as is seen in the schema)
 		node_fields = {'GraphID':ogr.OFTInteger}
@@ -3872,10 +3980,8 @@ class write:
 		for e in G.edges(data=True):
 			edge_attrs = []
 			edge_geometry_attrs = []
-			if not multigraph:
-				data = G.get_edge_data(*e)
-			else:
-				data = G.get_edge_data(e[0], e[1], e[2]['uuid'])
+			#the edge tuple carries the edge's own attribute dict
+			data = e[2]
 
 			for edge_attribute in edge_table_fieldnames:
 				if edge_attribute != 'Wkt' and edge_attribute != 'Wkb' and edge_attribute != 'Json' and edge_attribute != 'view_id' and edge_attribute != 'geomid' and edge_attribute != 'ShpName':
@@ -3916,19 +4022,10 @@ class write:
 		else:
 			tblnodes = self.tblnodes
 			tbledge_geom = self.tbledge_geom
-			tbledges = self.tbledge
-
-		#load the nodes
-		node_load_sql_from_csv = "COPY %s FROM '%s' DELIMITERS ',' CSV HEADER; " % (tblnodes, node_csv_filename)
-		self.conn.ExecuteSQL(node_load_sql_from_csv)
+			tbledges = self.tbledges
 
-		#load the edge geometry
-		edge_geometry_load_sql_from_csv = "COPY %s FROM '%s' DELIMITERS ',' CSV HEADER; " % (tbledge_geom, edge_geom_csv_filename)
-		self.conn.ExecuteSQL(edge_geometry_load_sql_from_csv)
-
-		#load the edges
-		edge_sql_from_csv = "COPY %s FROM '%s' DELIMITERS ',' CSV HEADER; " % (tbledges, edge_csv_filename)
-		self.conn.ExecuteSQL(edge_sql_from_csv)
+		#load the nodes, edge geometry and edges
+		self.copy_from_csv([(tblnodes, node_csv_filename), (tbledge_geom, edge_geom_csv_filename), (tbledges, edge_csv_filename)])
 
 		#execute create node view sql
 		nisql(self.conn).create_node_view(self.prefix)
@@ -4000,6 +4097,7 @@ class write:
 		#create network tables
 		if result == 0 or result == None:
 			if overwrite is True:
+				self._layer_cache.clear()
 				nisql(self.conn).delete_network(self.prefix)
 
 				result = nisql(self.conn).create_network_tables(self.prefix, self.srs, directed, multigraph)
@@ -4013,9 +4111,7 @@ class write:
 		new_edge_header = []
 
 		#set the node, edge and edge_geometry tables
-		self.lyredges = self.getlayer(self.tbledges)
-		self.lyrnodes = self.getlayer(self.tblnodes)
-		self.lyredge_geom = self.getlayer(self.tbledge_geom)
+		self.lyredges, self.lyrnodes, self.lyredge_geom = self.getlayers([self.tbledges, self.tblnodes, self.tbledge_geom])
 
 		#checking capitals for table names
 		matches = re.findall('[A-Z]', self.prefix)
@@ -4028,11 +4124,7 @@ class write:
 		else:
 			tblnodes = self.tblnodes
 			tbledge_geom = self.tbledge_geom
-			tbledges = self.tbledge
-
-		node_sql = 'COPY %s ' % tblnodes
-		edge_sql = 'COPY %s ' % tbledges
-		edge_geometry_sql = 'COPY %s ' % tbledge_geom
+			tbledges = self.tbledges
 
 		#define default field types for Node and Edge fields
 		node_fields = {'NodeID':ogr.OFTInteger}
@@ -4118,7 +4210,6 @@ class write:
 				node_item_counter = node_item_counter + 1
 
 			node_sql = "%s FROM '%s' DELIMITERS ',' CSV HEADER; " % (node_sql, flnodes)'''
-			node_sql = "%s FROM '%s' DELIMITERS ',' CSV HEADER; " % (node_sql, new_node_name)
 
 			#loop node header
 			for node_header_item in node_header:
@@ -4211,7 +4302,6 @@ class write:
 				edge_item_counter = edge_item_counter + 1
 
 			edge_sql = "%s FROM '%s' DELIMITERS ',' CSV HEADER; " % (edge_sql, fledges)'''
-			edge_sql = "%s FROM '%s' DELIMITERS ',' CSV HEADER; " % (edge_sql, new_edge_name)
 
 			col_index = 0
 			#loop edge header
@@ -4264,8 +4354,6 @@ class write:
 					edge_geometry_sql = '%s, %s)' % (edge_geometry_sql, edge_geometry_item)
 				edge_geometry_item_counter = edge_geometry_item_counter + 1'''
 
-			edge_geometry_sql = "%s FROM '%s' DELIMITERS ',' CSV HEADER; " % (edge_geometry_sql, fledge_geometry)
-
 			col_index = 0
 			#loop edge_geometry header
 			for edge_geometry_header_item in edge_geometry_header:
@@ -4289,20 +4377,14 @@ class write:
 		edge_geometry_f.close()
 		edge_f.close()
 
-		#load the nodes
-		self.conn.ExecuteSQL(node_sql)
+		#load the nodes, edge geometry and edges
+		self.copy_from_csv([(tblnodes, new_node_name), (tbledge_geom, fledge_geometry), (tbledges, new_edge_name)])
 
 		#remove the new node file
 		if os.path.isfile(new_node_name):
 			os.remove(new_node_name)
 
-		#load the edge geometry
-		self.conn.ExecuteSQL(edge_geometry_sql)
-
-		#load the edges
-		self.conn.ExecuteSQL(edge_sql)
-
-		#remove the new node file
+		#remove the new edge file
 		if os.path.isfile(new_edge_name):
 			os.remove(new_edge_name)
 
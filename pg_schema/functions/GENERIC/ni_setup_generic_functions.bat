@@ -51,6 +51,7 @@ psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_get_graph_id_by_prefix.sql"
 psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_get_graph_id_by_prefix.sql"
 psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_get_all_table_column_names.sql"
 psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_get_all_view_column_names.sql"
+psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_graph_csv_queries.sql"
 psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_graph_to_csv_3.sql"
 psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_graph_to_csv_4.sql"
 psql -h %1 -U %2 -d %4 -w -f "%~dp0ni_get_graph_to_gephi_edge_list.sql"
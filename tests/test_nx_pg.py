@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the nx_pg helpers which need no database.
+"""
+import struct
+
+import networkx as nx
+from osgeo import ogr
+
+from nx_pgnet import nx_pg
+
+__author__ = "Craig Robson"
+__copyright__ = "Craig Robson"
+__license__ = "none"
+
+
+class FakeCursor(object):
+    '''DB-API cursor recording statements, and the text of each COPY.'''
+
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, args=None):
+        self.log.append((sql, args))
+
+    def fetchall(self):
+        return []
+
+    def copy_expert(self, sql, stream):
+        self.log.append((sql, stream.read()))
+
+    def close(self):
+        pass
+
+
+class FakeConnection(object):
+    '''DB-API connection handing out FakeCursors sharing one log.'''
+
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.log.append('commit')
+
+    def rollback(self):
+        self.log.append('rollback')
+
+
+class FakeLayer(object):
+    '''The parts of an OGR layer the COPY loaders use.'''
+
+    def __init__(self, name):
+        self.name = name
+        self.fields = []
+
+    def GetName(self):
+        return self.name
+
+    def GetFIDColumn(self):
+        return 'ogc_fid'
+
+    def GetGeometryColumn(self):
+        return 'wkb_geometry'
+
+    def CreateField(self, field):
+        self.fields.append(field)
+
+    def GetLayerDefn(self):
+        return self
+
+    def GetFieldCount(self):
+        return len(self.fields)
+
+    def GetFieldDefn(self, index):
+        return self.fields[index]
+
+    def SyncToDisk(self):
+        return 0
+
+
+def test_copy_value():
+    assert nx_pg._copy_value(None) == '\\N'
+    assert nx_pg._copy_value(1.5) == '1.5'
+    assert nx_pg._copy_value('a\tb\\c\nd\re') == 'a\\tb\\\\c\\nd\\re'
+
+
+def test_field_value():
+    assert nx_pg._field_value(2.7, ogr.OFTInteger) == 2
+    assert nx_pg._field_value(3, ogr.OFTReal) == 3.0
+    assert nx_pg._field_value(True, ogr.OFTString) is True
+    assert nx_pg._field_value(None, ogr.OFTInteger) is None
+    # left for COPY to reject
+    assert nx_pg._field_value('x', ogr.OFTInteger) == 'x'
+
+
+def test_copy_features():
+    log = []
+    nx_pg.copy_features(FakeCursor(log), FakeLayer('net_Edges'), ['ogc_fid', 'na"me'],
+                        iter([(1, 'a'), (2, None)]))
+    assert log == [('COPY "net_Edges" ("ogc_fid", "na""me") FROM STDIN', '1\ta\n2\t\\N\n')]
+
+
+def test_copy_pg():
+    graph = nx.Graph()
+    graph.add_edge((0, 0), (1, 1), {'count': 2, 'name': 'a'})
+    graph.add_edge((1, 1), (2, 0), {'count': 2.5})
+    conn = FakeConnection()
+    nodes, edges = FakeLayer('net_Nodes'), FakeLayer('net_Edges')
+    nx_pg.copy_pg(conn, graph, nodes, edges)
+
+    assert [field.GetName() for field in edges.fields] == ['count', 'name']
+    copies = dict(entry for entry in conn.log if entry[0].startswith('COPY'))
+    node_rows = copies['COPY "net_Nodes" ("ogc_fid", "wkb_geometry") FROM STDIN'].splitlines()
+    assert [row.split('\t')[0] for row in node_rows] == ['1', '2', '3']
+    edge_rows = copies['COPY "net_Edges" ("ogc_fid", "wkb_geometry", "count", "name") FROM STDIN'].splitlines()
+    # count was first seen as an integer, so 2.5 is written as 2
+    assert sorted(row.split('\t', 2)[2] for row in edge_rows) == ['2\t\\N', '2\ta']
+    assert conn.log[-1] == 'commit'
+
+
+def test_point_wkb():
+    wkb = nx_pg.point_wkb(1.5, -2.0)
+    assert struct.unpack('<BIdd', wkb) == (1, 1, 1.5, -2.0)
+
+
+def test_set_fid_sequences():
+    log = []
+    nx_pg.set_fid_sequences(FakeCursor(log), [(FakeLayer('net_Nodes'), 3), (FakeLayer('net_Edges'), 0)])
+    # empty tables keep their sequence
+    assert log == [('SELECT setval(pg_get_serial_sequence(%s, %s), %s)', ('"net_Nodes"', 'ogc_fid', 3))]
+
+
+def test_copy_stream():
+    rows = [(1, 'a\tb', None), (2, 'back\\slash\nline', 3.5)]
+    expected = '1\ta\\tb\t\\N\n2\tback\\\\slash\\nline\t3.5\n'
+    assert nx_pg.CopyStream(rows).read() == expected
+    # reads of any size add up to the same text
+    stream = nx_pg.CopyStream(iter(rows))
+    chunks = []
+    chunk = stream.read(4)
+    while chunk:
+        assert len(chunk) <= 4
+        chunks.append(chunk)
+        chunk = stream.read(4)
+    assert ''.join(chunks) == expected
+
+
+def test_copy_stream_empty():
+    assert nx_pg.CopyStream([]).read() == ''
+
+
+def test_wkb_type():
+    assert nx_pg.wkb_type(nx_pg.point_wkb(1.0, 2.0)) == 1
+    assert nx_pg.wkb_type(nx_pg.line_wkb(0.0, 0.0, 1.0, 1.0)) == 2
+    # big endian header
+    assert nx_pg.wkb_type(struct.pack('>BII', 0, 5, 0)) == 5
+    # EWKB with the SRID flag set, and ISO Z
+    assert nx_pg.wkb_type(struct.pack('<BII', 1, 0x20000002, 27700)) == 2
+    assert nx_pg.wkb_type(struct.pack('<BI', 1, 1001)) == 1
+
+
+def test_line_wkb_ends():
+    wkb = struct.pack('<BII6d', 1, 2, 3, 0.0, 1.0, 2.0, 3.0, 4.0, 5.5)
+    fmt, n, first, last = nx_pg.line_wkb_ends(wkb)
+    assert n == 3
+    assert struct.unpack_from(fmt, wkb, first) == (0.0, 1.0)
+    assert struct.unpack_from(fmt, wkb, last) == (4.0, 5.5)
+
+
+def test_line_wkb_ends_big_endian():
+    wkb = struct.pack('>BII4d', 0, 2, 2, 1.0, 2.0, 3.0, 4.0)
+    fmt, n, first, last = nx_pg.line_wkb_ends(wkb)
+    assert struct.unpack_from(fmt, wkb, first) == (1.0, 2.0)
+    assert struct.unpack_from(fmt, wkb, last) == (3.0, 4.0)
+
+
+def test_line_wkb_ends_not_a_line():
+    assert nx_pg.line_wkb_ends(nx_pg.point_wkb(1.0, 2.0)) is None
+    assert nx_pg.line_wkb_ends(struct.pack('<BII', 1, 2, 0)) is None
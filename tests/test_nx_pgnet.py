@@ -0,0 +1,379 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Unit tests for the nx_pgnet helpers which need no database.
+"""
+import io
+import json
+import re
+import uuid
+
+import networkx as nx
+import pytest
+from networkx.readwrite import json_graph
+from osgeo import ogr
+
+from nx_pgnet import nx_pgnet
+
+__author__ = "Craig Robson"
+__copyright__ = "Craig Robson"
+__license__ = "none"
+
+
+class FakeFeature(object):
+    '''A result row of ExecuteSQL.'''
+
+    def __init__(self, *fields):
+        self.fields = fields
+
+    def GetField(self, index):
+        return self.fields[index]
+
+
+class FakeDataSource(object):
+    '''OGR connection recording statements and answering them with respond(sql).'''
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.sql = []
+
+    def ExecuteSQL(self, sql):
+        self.sql.append(sql)
+        return self.respond(sql)
+
+    def ReleaseResultSet(self, result):
+        pass
+
+
+class FakeLayer(object):
+    '''The parts of an OGR layer the batched writers use.'''
+
+    def GetGeometryColumn(self):
+        return 'geom'
+
+    def GetLayerDefn(self):
+        return self
+
+    def GetFieldIndex(self, name):
+        return -1
+
+
+def batch_wkb(sql):
+    '''Return the (index, hex wkb) pairs of a flush_edge_geometries statement.'''
+    return re.findall(r"\((\d+), ST_GeomFromWKB\(decode\('(\w+)'", sql)
+
+
+def test_flush_edge_geometries(monkeypatch):
+    monkeypatch.setattr(nx_pgnet, 'EDGE_BATCH_SIZE', 3)
+    geom_ids = {}
+
+    def respond(sql):
+        # the database matches lines with ST_Equals, here reversed lines are equal
+        rows = []
+        for index, wkb in batch_wkb(sql):
+            line = ogr.CreateGeometryFromWkb(bytes(bytearray.fromhex(wkb)))
+            points = tuple(line.GetPoint_2D(i) for i in range(line.GetPointCount()))
+            key = min(points, points[::-1])
+            rows.append(FakeFeature(int(index), geom_ids.setdefault(key, len(geom_ids) + 1)))
+        return rows[::-1]
+
+    writer = nx_pgnet.write(FakeDataSource(respond))
+    writer.tbledge_geom, writer.tbledges, writer.srs = 'net_Edge_Geometry', 'net_Edges', 27700
+    writer.lyredge_geom = FakeLayer()
+    writer._edge_rows = {}
+    writer._edge_geoms = []
+    edges = [{'name': name, 'GraphID': 1} for name in 'abc']
+    for edge, wkt in zip(edges, ('LINESTRING (0 0,1 1)', 'LINESTRING (1 1,0 0)', 'LINESTRING (1 1,2 0)')):
+        writer.pgnet_edge(edge, ogr.CreateGeometryFromWkt(wkt))
+
+    # one statement matches and inserts the batch with ST_Equals, then the edges are inserted
+    geometry_sql, edge_sql = writer.conn.sql
+    assert 'ST_Equals' in geometry_sql
+    assert edge_sql.startswith('INSERT INTO "net_Edges"')
+    assert [edge['Edge_GeomID'] for edge in edges] == [1, 1, 2]
+    assert writer._edge_geoms == []
+
+
+def test_flush_edge_geometries_missing_row():
+    writer = nx_pgnet.write(FakeDataSource(lambda sql: []))
+    writer.tbledge_geom, writer.srs = 'net_Edge_Geometry', 27700
+    writer.lyredge_geom = FakeLayer()
+    writer._edge_geoms = [({'name': 'a'}, nx_pgnet._hex_wkb(ogr.CreateGeometryFromWkt('LINESTRING (0 0,1 1)')))]
+    with pytest.raises(nx_pgnet.Error):
+        writer.flush_edge_geometries()
+
+
+def test_wkt_point_xy():
+    assert nx_pgnet._wkt_point_xy('POINT (1 2.5)') == (1.0, 2.5)
+    assert nx_pgnet._wkt_point_xy('point(-1e2 .5)') == (-100.0, 0.5)
+
+
+def test_wkt_line_ends():
+    assert nx_pgnet._wkt_line_ends('LINESTRING (0 0, 1 1, 2 3.5)') == ((0.0, 0.0), (2.0, 3.5))
+    assert nx_pgnet._wkt_line_ends('linestring(1 2,3 4)') == ((1.0, 2.0), (3.0, 4.0))
+
+
+def example_graph(graph_class):
+    graph = graph_class(name='example')
+    graph.add_node((0, 0), {'Wkt': 'POINT (0 0)', 'Wkb': b'\x01', 'pop': 5})
+    graph.add_node((1, 1), {'Wkt': 'POINT (1 1)', 'name': u'\xe9'})
+    graph.add_node((2.5, 1), {'Wkt': 'POINT (2.5 1)', 'value': None})
+    return graph
+
+
+def test_multigraph_json_round_trip(tmpdir):
+    graph = example_graph(nx.MultiGraph)
+    keys = []
+    for u, v in (((0, 0), (1, 1)), ((0, 0), (1, 1)), ((1, 1), (2.5, 1))):
+        # multigraph edges are keyed by uuid4 integers, wider than 64 bits
+        key = uuid.uuid4().int
+        keys.append(key)
+        graph.add_edge(u, v, key=key, attr_dict={'uuid': key, 'Wkt': 'LINESTRING (%s %s, %s %s)' % (u + v)})
+
+    path = nx_pgnet.export_graph(True).export_to_json(graph, str(tmpdir), 'network')
+    imported = nx_pgnet.import_graph().import_from_json(path, 'network')
+
+    assert imported.is_multigraph()
+    edges = imported.edges(keys=True, data=True)
+    assert sorted(key for u, v, key, data in edges) == sorted(keys)
+    for u, v, key, data in edges:
+        assert data['uuid'] == key
+        assert type(key) is int
+
+
+def node_writer(respond):
+    writer = nx_pgnet.write(FakeDataSource(respond))
+    writer.tblnodes, writer.srs = 'net_Nodes', 27700
+    writer.lyrnodes = FakeLayer()
+    writer._node_geom_ids = {}
+    return writer
+
+
+def test_pgnet_nodes_matches_returned_rows():
+    graph = nx.Graph()
+    graph.add_edge((0, 0), (1, 1))
+    graph.add_edge((1, 1), (2.5, 1))
+
+    def respond(sql):
+        # RETURNING rows come back in no set order
+        return [FakeFeature(100 + index, wkb) for index, wkb in enumerate(re.findall(r"decode\('(\w+)'", sql))][::-1]
+
+    writer = node_writer(respond)
+    node_ids = writer.pgnet_nodes(graph, {'GraphID': None}, 7)
+    assert node_ids == {(0, 0): 100, (1, 1): 101, (2.5, 1): 102}
+    assert writer._node_geom_ids == {(0.0, 0.0): 100, (1.0, 1.0): 101, (2.5, 1.0): 102}
+    assert writer.conn.sql[0].startswith('INSERT INTO "net_Nodes" ("GraphID","geom") VALUES (7,')
+
+
+def test_pgnet_nodes_missing_row():
+    graph = nx.Graph()
+    graph.add_edge((0, 0), (1, 1))
+    writer = node_writer(lambda sql: [FakeFeature(100, re.findall(r"decode\('(\w+)'", sql)[0])])
+    with pytest.raises(nx_pgnet.Error):
+        writer.pgnet_nodes(graph, {}, 7)
+
+
+def test_parse_coordinates():
+    coordinates = nx_pgnet._parse_coordinates('(100, 100.5)')
+    assert coordinates == (100, 100.5)
+    assert [type(value) for value in coordinates] == [int, float]
+    assert nx_pgnet._parse_coordinates(' ( -1e3 ,2 ) ') == (-1000.0, 2)
+    # anything else is read as a Python literal
+    assert nx_pgnet._parse_coordinates("('a', 1)") == ('a', 1)
+
+
+CSV_TEXT = ('NodeID,geom,name,count\n'
+            '1,POINT (0 0),"a, b",\n'
+            '2,POINT (1 1),c,3\n')
+
+
+def check_read_csv(path):
+    geometries, records = nx_pgnet._read_csv(path, 'geom', ('NodeID', 'view_id'))
+    assert geometries == ['POINT (0 0)', 'POINT (1 1)']
+    # values stay strings, empty values are not turned into NaN
+    assert records == [{'geom': 'POINT (0 0)', 'name': 'a, b', 'count': ''},
+                       {'geom': 'POINT (1 1)', 'name': 'c', 'count': '3'}]
+    geometries, records = nx_pgnet._read_csv(path, 'geometry', ())
+    assert geometries is None
+    assert records[1]['NodeID'] == '2'
+
+
+def test_read_csv(tmpdir, monkeypatch):
+    path = tmpdir.join('nodes.csv')
+    path.write(CSV_TEXT)
+    monkeypatch.setattr(nx_pgnet, 'pandas', None)
+    check_read_csv(str(path))
+
+
+def test_read_csv_pandas(tmpdir, monkeypatch):
+    pandas = pytest.importorskip('pandas')
+    path = tmpdir.join('nodes.csv')
+    path.write(CSV_TEXT)
+    monkeypatch.setattr(nx_pgnet, 'pandas', pandas)
+    check_read_csv(str(path))
+
+
+@pytest.mark.parametrize('graph_class', [nx.Graph, nx.MultiDiGraph])
+def test_export_copy(graph_class):
+    graph = example_graph(graph_class)
+    graph.add_edge((0, 0), (1, 1), attr_dict={'Wkt': 'LINESTRING (0 0, 1 1)', 'Wkb': b'\x01', 'weight': None})
+    export = nx_pgnet._export_copy(graph, frozenset(('Wkb',)), none_to_string=True)
+
+    assert type(export) is graph_class
+    assert export.graph == graph.graph
+    assert export.node[(0, 0)] == {'Wkt': 'POINT (0 0)', 'pop': 5}
+    assert export.node[(2.5, 1)] == {'Wkt': 'POINT (2.5 1)', 'value': 'None'}
+    edge_data = [edge[-1] for edge in export.edges(data=True)]
+    assert edge_data == [{'Wkt': 'LINESTRING (0 0, 1 1)', 'weight': 'None'}]
+    # the graph itself is left as it was
+    assert graph.node[(0, 0)]['Wkb'] == b'\x01'
+    assert graph.node[(2.5, 1)]['value'] is None
+    if graph.is_multigraph():
+        assert export.edges(keys=True) == graph.edges(keys=True)
+
+
+def test_connection_parameter():
+    name = "PG: host='localhost' dbname = 'my db' user=postgres port=5433"
+    params = dict((key, quoted or unquoted) for key, quoted, unquoted
+                  in nx_pgnet._CONNECTION_PARAMETER.findall(name))
+    assert params == {'host': 'localhost', 'dbname': 'my db',
+                      'user': 'postgres', 'port': '5433'}
+
+
+@pytest.mark.parametrize('use_orjson', [False, True])
+@pytest.mark.parametrize('graph_class', [nx.Graph, nx.MultiDiGraph])
+def test_write_node_link_json(monkeypatch, use_orjson, graph_class):
+    if use_orjson:
+        monkeypatch.setattr(nx_pgnet, 'orjson', pytest.importorskip('orjson'))
+    else:
+        monkeypatch.setattr(nx_pgnet, 'orjson', None)
+    graph = example_graph(graph_class)
+    graph.add_edge((0, 0), (1, 1), attr_dict={'Wkt': 'LINESTRING (0 0, 1 1)', 'Json': '{}', 'weight': 1.5})
+    graph.add_edge((1, 1), (2.5, 1), attr_dict={'Wkt': 'LINESTRING (1 1, 2.5 1)'})
+
+    json_file = io.BytesIO()
+    nx_pgnet._write_node_link_json(graph, json_file, nx_pgnet._JSON_EXPORT_SKIP_KEYS)
+
+    for data in [data for node, data in graph.nodes(data=True)] + [edge[-1] for edge in graph.edges(data=True)]:
+        data.pop('Wkb', None)
+        data.pop('Json', None)
+    expected = json.loads(json.dumps(json_graph.node_link_data(graph)))
+    assert json.loads(json_file.getvalue().decode('utf-8')) == expected
+
+
+def test_json_dumps_wide_integers(monkeypatch):
+    monkeypatch.setattr(nx_pgnet, 'orjson', pytest.importorskip('orjson'))
+    key = uuid.uuid4().int | (1 << 127)
+    assert json.loads(nx_pgnet._json_dumps({'uuid': key}).decode('utf-8')) == {'uuid': key}
+
+
+def write_network_csv(tmpdir, edge_geometry_text):
+    '''Write node, edge and edge geometry csv files as ni_graph_to_csv does.'''
+    tmpdir.join('nodes.csv').write('GraphID,NodeID,geom_text\n'
+                                   '1,1,srid=27700;POINT (0 0)\n'
+                                   '1,2,srid=27700;POINT (1 1)\n'
+                                   '1,3,srid=27700;POINT (2 0)\n')
+    tmpdir.join('edges.csv').write('EdgeID,Node_F_ID,Node_T_ID,GraphID,Edge_GeomID,name\n'
+                                   '1,1,2,1,10,a\n'
+                                   '2,2,3,1,11,\n')
+    tmpdir.join('edge_geometry.csv').write_binary(edge_geometry_text.encode('utf-8'))
+    return [str(tmpdir.join(name)) for name in ('nodes.csv', 'edges.csv', 'edge_geometry.csv')]
+
+
+def test_pgnet_via_csv_casts(tmpdir):
+    paths = write_network_csv(tmpdir, 'GeomID,geom_text\n'
+                                      '10,"srid=27700;LINESTRING (0 0,1 1)"\n'
+                                      '11,"srid=27700;LINESTRING (1 1,2 0)"\n')
+    network = nx_pgnet.read(object()).pgnet_via_csv('net', *paths)
+
+    assert network.node[(0.0, 0.0)]['GraphID'] == 1
+    edge = network.edge[(0.0, 0.0)][(1.0, 1.0)]
+    assert (edge['EdgeID'], edge['Node_F_ID'], edge['Edge_GeomID'], edge['name']) == (1, 1, 10, 'a')
+    # empty values are left as they are rather than given a type
+    assert network.edge[(1.0, 1.0)][(2.0, 0.0)]['name'] == ''
+
+
+@pytest.mark.parametrize('edge_geometry_text', [
+    'GeomID,geom_text\n10,"srid=27700;LINESTRING (0 0,1 1)"\n11,"srid=27700;LINESTRING (1 1,2 0)"\n',
+    'geom,GeomID\r\n"srid=27700;LINESTRING (0 0,1 1)",10\r\n"srid=27700;LINESTRING (1 1,2 0)",11\r\n'])
+def test_pgnet_via_csv_edge_geometry(tmpdir, edge_geometry_text):
+    paths = write_network_csv(tmpdir, edge_geometry_text)
+    network = nx_pgnet.read(object()).pgnet_via_csv('net', *paths)
+
+    assert sorted(network.edges()) == [((0.0, 0.0), (1.0, 1.0)), ((1.0, 1.0), (2.0, 0.0))]
+    edge = network.edge[(0.0, 0.0)][(1.0, 1.0)]
+    # no csv quotes or line endings are left in the geometry text
+    assert edge['Wkt'] == 'LINESTRING (0 0,1 1)'
+    assert ogr.CreateGeometryFromWkt(edge['Wkt']).GetPointCount() == 2
+
+
+def test_pgnet_via_csv_edge_geometry_header(tmpdir):
+    paths = write_network_csv(tmpdir, 'id,wkt\n10,"LINESTRING (0 0,1 1)"\n')
+    with pytest.raises(nx_pgnet.Error):
+        nx_pgnet.read(object()).pgnet_via_csv('net', *paths)
+
+
+def pajek_graph():
+    graph = nx.Graph(name='net')
+    graph.add_node((0, 0), {'name': ' a ', 'Wkt': 'POINT (0 0)'})
+    graph.add_node((1, 1.5), {'name': 'c', 'Wkt': 'POINT (1 1.5)'})
+    graph.add_edge((0, 0), (1, 1.5), {'length': 2.5, 'Wkt': 'LINESTRING (0 0, 1 1.5)'})
+    return graph
+
+
+def test_pajek_view():
+    graph = pajek_graph()
+    view = nx_pgnet._PajekView(graph, 'net', 'name', 'length')
+
+    assert view.order() == 2 and not view.is_directed() and not view.is_multigraph()
+    assert view.node.get((1, 1.5)) == {'x': 1.0, 'y': 1.5, 'name': 'c'}
+    assert view.node.get((5, 5), {}) == {}
+    assert dict(view.nodes(data=True))[(0, 0)] == {'x': 0.0, 'y': 0.0, 'name': 'a'}
+    assert list(view.edges(data=True)) == [((0, 0), (1, 1.5), {'weight': 2.5})]
+    # a value that is not an attribute name is the weight of every edge
+    view = nx_pgnet._PajekView(graph, 'net', 'name', 1)
+    assert list(view.edges(data=True)) == [((0, 0), (1, 1.5), {'weight': 1})]
+    assert list(nx.generate_pajek(view))[-1] == '1 2 1'
+    # the graph is not copied or changed
+    assert graph.node[(0, 0)] == {'name': ' a ', 'Wkt': 'POINT (0 0)'}
+
+
+@pytest.mark.parametrize('node_attribute_label', [None, ''])
+def test_pajek_view_without_label(node_attribute_label):
+    view = nx_pgnet._PajekView(pajek_graph(), 'net', node_attribute_label, 'length')
+    assert view.node.get((1, 1.5)) == {'x': 1.0, 'y': 1.5}
+
+
+class FakeResult(list):
+    '''Result set of ExecuteSQL read with GetNextFeature.'''
+
+    def GetNextFeature(self):
+        return self.pop(0) if self else None
+
+
+class FakeScalar(object):
+    '''A single value row, whatever field is asked for.'''
+
+    def __init__(self, value):
+        self.value = value
+
+    def GetField(self, field):
+        return self.value
+
+
+@pytest.mark.parametrize('in_session', [0, 1])
+def test_execute_prepares_once_per_session(in_session):
+    def respond(sql):
+        if 'pg_prepared_statements' in sql:
+            return FakeResult([FakeScalar(in_session)])
+        if sql.startswith('EXECUTE'):
+            return FakeResult([FakeScalar(42)])
+
+    conn = FakeDataSource(respond)
+    sql = nx_pgnet.nisql(conn)
+    assert sql.edge_geometry_equality_check('net', 'LINESTRING (0 0, 1 1)', 27700) == 42
+    assert sql.edge_geometry_equality_check('net', 'LINESTRING (0 0, 1 1)', 27700) == 42
+    prepares = [statement for statement in conn.sql if statement.startswith('PREPARE')]
+    # a statement already prepared in the session is reused
+    assert len(prepares) == 1 - in_session
+    assert len([statement for statement in conn.sql if statement.startswith('EXECUTE')]) == 2